@@ -0,0 +1,129 @@
+import json  # Question term vectors stored as JSON
+import math  # Vector norms for cosine similarity
+import os  # For reading configuration from environment variables
+import re  # Question normalization
+import time  # Timestamps used for TTL expiry and least-recently-used eviction
+from collections import Counter  # Question term vectors
+
+import sqlite_cache  # Shared connection, counter and eviction helpers
+
+DB_PATH = os.getenv("ASTRADOC_ANSWER_DB", "astradoc_answers.db")  # SQLite database file name
+MAX_BYTES = int(os.getenv("ASTRADOC_ANSWER_DB_MAX_BYTES", 16 * 1024 * 1024))  # Size cap before eviction
+TTL_SECONDS = int(os.getenv("ASTRADOC_ANSWER_TTL", 7 * 24 * 3600))  # Answers older than this are recomputed
+# Cosine similarity at which a differently worded question reuses an answer; 0 disables it
+SIMILARITY = float(os.getenv("ASTRADOC_ANSWER_SIMILARITY", 0))
+
+# Only articles are dropped: pronouns, auxiliaries, negations and interrogatives all change
+# what a question asks ("his salary" / "her salary", "What was the fee?" / "What will the fee be?")
+_QUESTION_STOP_WORDS = {"a", "an", "the"}
+_TERM_PATTERN = re.compile(r"\w+")
+_KEY_VERSION = "v2"  # Prefix of stored keys; entries normalized by older rules never match
+
+
+def normalize_question(question):
+    """
+    Lowercase the question and drop punctuation, extra whitespace and
+    articles: "What is the notice period?" and "what's  the NOTICE period"
+    normalize to the same key.
+    """
+    terms = _TERM_PATTERN.findall(question.lower().replace("'s", " is"))
+    return " ".join(term for term in terms if term not in _QUESTION_STOP_WORDS)
+
+
+def _cosine(first, second):
+    dot = sum(count * second.get(term, 0) for term, count in first.items())
+    norms = math.sqrt(sum(c * c for c in first.values())) * math.sqrt(sum(c * c for c in second.values()))
+    return dot / norms if norms else 0.0
+
+
+def init_cache():
+    """
+    Create the answers and stats tables if they don't exist.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS answers (
+            document TEXT,          -- Digest of the document text (and model/prompt version)
+            question TEXT,          -- Key version and normalize_question() of the question
+            terms TEXT,             -- JSON term counts of the normalized question
+            answer TEXT,            -- Answer returned for it
+            size INTEGER,           -- Size of the answer in bytes
+            created REAL,           -- Unix time the answer was computed (for the TTL)
+            last_used REAL,         -- Unix time of the last read or write
+            PRIMARY KEY (document, question)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers (last_used)")
+    conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+    conn.commit()
+    conn.close()
+
+
+def get_answer(document, question, similarity=None):
+    """
+    Return the cached answer to question for document, or None on a miss.
+    The normalized question is looked up first; with a similarity threshold
+    above 0 (default SIMILARITY), the cached question of the document closest
+    by cosine similarity of its terms is used when it reaches the threshold.
+    Expired answers are misses; questions that normalize to nothing (only
+    punctuation or articles) are never cached.
+    """
+    similarity = SIMILARITY if similarity is None else similarity
+    normalized = normalize_question(question)
+    if not normalized:
+        return None
+    fresh_after = time.time() - TTL_SECONDS
+    conn = sqlite_cache.connect(DB_PATH)
+    row = conn.execute(
+        "SELECT question, answer FROM answers WHERE document = ? AND question = ? AND created > ?",
+        (document, f"{_KEY_VERSION} {normalized}", fresh_after)
+    ).fetchone()
+    if row is None and similarity > 0:
+        vector = Counter(normalized.split())
+        best = 0.0
+        for cached_question, terms, answer in conn.execute(
+                "SELECT question, terms, answer FROM answers WHERE document = ? AND question LIKE ? AND created > ?",
+                (document, f"{_KEY_VERSION} %", fresh_after)):
+            score = _cosine(vector, json.loads(terms))
+            if score >= similarity and score > best:
+                row, best = (cached_question, answer), score
+
+    if row is not None:
+        conn.execute("UPDATE answers SET last_used = ? WHERE document = ? AND question = ?",
+                     (time.time(), document, row[0]))
+    sqlite_cache.count(conn, "hits" if row is not None else "misses")
+    conn.commit()
+    conn.close()
+    return row[1] if row else None
+
+
+def put_answer(document, question, answer, max_bytes=MAX_BYTES):
+    """
+    Cache the answer to question for document, then drop expired entries and
+    evict least recently used ones until the cache is back under max_bytes.
+    """
+    normalized = normalize_question(question)
+    if not normalized:
+        return
+    now = time.time()
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute(
+        "INSERT OR REPLACE INTO answers (document, question, terms, answer, size, created, last_used) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (document, f"{_KEY_VERSION} {normalized}", json.dumps(Counter(normalized.split())), answer,
+         len(answer.encode("utf-8")), now, now)
+    )
+    conn.execute("DELETE FROM answers WHERE created <= ?", (now - TTL_SECONDS,))
+    sqlite_cache.evict_lru(conn, "answers", ("document", "question"), max_bytes)
+    conn.commit()
+    conn.close()
+
+
+def get_stats():
+    """
+    Return cache statistics as a dict: hits, misses, entries and bytes.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    stats = sqlite_cache.get_stats(conn, "answers")
+    conn.close()
+    return stats
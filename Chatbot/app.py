@@ -1,118 +1,149 @@
 # 📦 Standard and Third-party Imports
-import os  # For interacting with the operating system (e.g., reading env vars)
+import queue  # Thread-safe hand-off of streamed tokens from worker threads to the UI
+import sqlite3  # Corpus index errors are reported in the UI
+import threading  # Background thread that drives a streamed summary
+import time  # Window for the aggregate usage panel
+import uuid  # Per-session id for usage metrics
+import zipfile  # Corrupt corpus archives are reported in the UI
 import streamlit as st  # Streamlit for building the web-based user interface
-from dotenv import load_dotenv  # For loading environment variables from a .env file
-from openai import OpenAI  # NVIDIA-compatible OpenAI SDK for API calls
 import extract  # Custom Python module containing functions to extract text from various document formats
-
-# 🌍 Load environment variables (like API keys)
-load_dotenv()
-api_key = os.getenv("NVIDIA_API_KEY")  # Fetch NVIDIA API key from the environment
-
-# 🤖 Initialize the OpenAI-compatible client (pointing to NVIDIA’s LLM endpoint)
-client = OpenAI(
-    base_url="https://integrate.api.nvidia.com/v1",  # NVIDIA-hosted OpenAI-compatible API
-    api_key=api_key
-)
+import extraction_cache  # Cross-session cache of extracted text keyed by file digest
+import answer_cache  # Cross-session cache of document answers
+import corpus  # Multi-document corpus ingestion and persistent search index
+import document_store  # Shared, memory-mapped store of extracted text
+from memory import ConversationMemory  # Token-budgeted chat memory with rolling summaries
+import core  # Document processing and LLM logic shared with headless entry points
+import speculative  # Background Brief summaries started right after processing
+import ingestion  # Progressive, page-range ingestion of large PDFs
+import metrics  # Per-call latency and token-usage records
+from core import summarize_file, find_answer_in_text, answer_corpus_question, summarize_conversation
 
 # 🔢 Configuration Constants
-MAX_TOKENS = 3000  # Token limit per chunk when processing documents
-OVERLAP = 500  # Overlap between chunks for better summarization continuity
-MODEL_NAME = "nvidia/llama-3.3-nemotron-super-49b-v1"  # Selected NVIDIA LLM model
 APP_NAME = "AstraDoc AI"  # Display name of the application
 APP_ICON = "💼"  # Emoji/icon shown in the browser tab
+USAGE_TTL_SECONDS = 60  # How long the all-sessions usage panel may be stale
 
 # 💾 Streamlit Session State Initialization
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []  # Store chat messages for persistence
 
+if "chat_memory" not in st.session_state:
+    st.session_state.chat_memory = ConversationMemory(summarize_conversation)  # Rolling chat memory
+
 if "doc_session" not in st.session_state:
     st.session_state.doc_session = {
-        "processed_text": "",  # Extracted text from the document
-        "summary": "",  # Cached summary text
+        "document": None,  # Handle on the extracted text in the shared document store
+        "summary": {},  # Cached summary text per (summary style, pre-summarization ratio, document digest)
+        "speculative": None,  # Background Brief summary started after processing, if any
+        "ingestion": None,  # Background page-range extraction of a large PDF, while it runs
+        "checklist": None,  # Last batch Q&A run: (document digest, [(question, answer), ...])
         "qa_ready": False  # Flag indicating whether Q&A can begin
     }
 
-# --------------------------
-# 📚 Document Processing Logic
-# --------------------------
+if "corpus_index" not in st.session_state:
+    st.session_state.corpus_index = None  # Path of the ingested corpus index
 
-# 🔗 Split large documents into chunks for summarization
-def chunk_text(text, max_tokens=MAX_TOKENS, overlap=OVERLAP):
-    chunk_size = max_tokens * 4  # Roughly estimate bytes per token
-    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size - overlap)]
-
-# ✏️ Summarize a single chunk of text using the NVIDIA LLM
-def summarize_chunk(content, summary_type, max_output_tokens):
-    prompt = f"Provide a {summary_type} professional summary of this document. Use complete sentences, no bullet points:\n\n{content}"
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[
-            {"role": "system", "content": "You are an executive summary assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.6,
-        top_p=0.95,
-        max_tokens=max_output_tokens,
-        stream=False
-    )
-    return response.choices[0].message.content.strip()
-
-# 📄 Summarize a full document by processing it in chunks
-def summarize_file(full_text, summary_type):
-    token_map = {"Brief": 500, "Detailed": 1024, "Key Points": 800}  # Output size mapping
-    chunks = chunk_text(full_text)  # Split into chunks
-    return "\n\n".join(summarize_chunk(chunk, summary_type, token_map[summary_type]) for chunk in chunks)
-
-# ❓ Find an answer to a user question from the document
-def find_answer_in_text(text, question):
-    prompt = f"""Answer this question based ONLY on the provided text. Be precise and professional:
-
-Text:
-\"\"\"{text}\"\"\"
-
-Question: {question}
-
-Respond with ONLY the factual answer."""
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[
-            {"role": "system", "content": "You are a factual Q&A system."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.3,
-        max_tokens=512,
-        stream=False
-    )
-    answer = response.choices[0].message.content.strip()
-    return answer if answer.lower() != "i don't know" else "Answer not found in document."
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex  # Attributes model calls to this session
+
+# Model calls made during this script run (and the threads it starts) count for this session
+metrics.current_session.set(st.session_state.session_id)
+
+# 🗄️ Create the summary store and cache tables if they don't exist
+core.init_stores()
 
 # --------------------------
 # 💬 AI Chat Interaction
 # --------------------------
 
 # Handles chat interface and appends messages to session
-def chat_with_ai(user_message):
-    st.session_state.chat_history.append({"role": "user", "content": user_message})
-
-    messages = [
-        {"role": "system", "content": "You are a professional AI assistant. Provide concise, helpful responses."}
-    ] + [
-        {"role": msg["role"], "content": msg["content"]}
-        for msg in st.session_state.chat_history[-6:]  # Limit history to last 6 messages
-    ]
-
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=messages,
-        temperature=0.7,
-        max_tokens=1024,
-        stream=False
+def chat_with_ai(user_message, on_token=None):
+    return core.chat_with_ai(
+        st.session_state.chat_history, st.session_state.chat_memory, user_message, on_token
     )
 
-    ai_response = response.choices[0].message.content.strip()
-    st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
-    return ai_response
+# --------------------------
+# 🌊 Streaming Helpers
+# --------------------------
+
+# Build an on_token callback that renders the growing text into a placeholder
+def render_tokens(placeholder):
+    parts = []
+
+    def on_token(delta):
+        parts.append(delta)
+        placeholder.markdown("".join(parts) + "▌")  # Cursor shows generation is in progress
+
+    return on_token
+
+# Run summarize_file in the background and render each chunk's text as it streams in.
+# Streamlit elements may only be updated from the script thread, so worker threads hand
+# their tokens over through a queue that this function drains.
+def summarize_file_streaming(full_text, summary_type, keep_ratio=None, stats=None):
+    events = queue.Queue()
+    result = {}
+
+    def run():
+        try:
+            result["summary"] = summarize_file(
+                full_text, summary_type, on_progress=lambda *event: events.put(event), keep_ratio=keep_ratio,
+                stats=stats
+            )
+        except Exception as e:
+            result["error"] = e
+        finally:
+            events.put(None)  # Sentinel: no more events
+
+    threading.Thread(target=metrics.bind_context(run), daemon=True).start()
+
+    progress = st.expander("Section summaries", expanded=True)
+    final_placeholder = st.empty()
+    placeholders, texts, final_text = [], [], []
+    while (event := events.get()) is not None:
+        stage, index, delta = event
+        if stage == "chunks":
+            placeholders = [progress.empty() for _ in range(index)]
+            texts = [""] * index
+        elif stage == "map":
+            texts[index] += delta
+            placeholders[index].markdown(f"**Section {index + 1}/{len(texts)}:** {texts[index]}")
+        elif stage == "reduce":
+            final_text.append(delta)
+            final_placeholder.markdown("".join(final_text) + "▌")
+    final_placeholder.empty()
+
+    if "error" in result:
+        raise result["error"]
+    return result["summary"]
+
+# --------------------------
+# 📥 Document Lifecycle
+# --------------------------
+
+# Make a stored document the session's current one and start work it will probably need
+def set_document(document):
+    st.session_state.doc_session["document"] = document
+    st.session_state.doc_session["qa_ready"] = True
+    core.document_index(document)  # Build (or reuse) the shared retrieval index once
+    # Start the usual first request, the Brief summary, before the user asks for it
+    st.session_state.doc_session["speculative"] = speculative.start(document)
+
+# Poll a background ingestion once a second; when it finishes, switch to the whole document
+@st.fragment(run_every=1)
+def ingestion_progress():
+    job = st.session_state.doc_session.get("ingestion")
+    if job is None:
+        return
+    if job.error is not None:
+        st.session_state.doc_session["ingestion"] = None
+        st.error(f"Extraction failed: {job.error}")
+        return
+    if job.done:
+        st.session_state.doc_session["ingestion"] = None
+        set_document(job.result)
+        st.rerun()  # Re-render the whole page on the complete document
+    fraction = job.pages_done / job.page_count if job.page_count else 0.0
+    st.progress(fraction, text=f"Extracting pages: {job.pages_done} of {job.page_count or '?'}")
 
 # --------------------------
 # 🎨 Streamlit UI Setup
@@ -131,9 +162,10 @@ st.set_page_config(
 # Sidebar Navigation
 app_mode = st.sidebar.radio(
     "Application Mode",
-    ["💬 AI Chat Assistant", "📄 Document Intelligence"],
+    ["💬 AI Chat Assistant", "📄 Document Intelligence", "📚 Corpus Q&A"],
     index=0  # Default selection
 )
+stream_responses = st.sidebar.checkbox("Stream responses", value=True)  # Render tokens as they arrive
 
 # --------------------------
 # 💬 Chat Assistant UI
@@ -166,16 +198,68 @@ if "AI Chat Assistant" in app_mode:
         with st.chat_message("user"):
             st.write(prompt)
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing..."):
-                response = chat_with_ai(prompt)
-            st.write(response)
+            if stream_responses:
+                placeholder = st.empty()
+                response = chat_with_ai(prompt, on_token=render_tokens(placeholder))
+                placeholder.write(response)
+            else:
+                with st.spinner("Analyzing..."):
+                    response = chat_with_ai(prompt)
+                st.write(response)
+
+# --------------------------
+# 📚 Corpus Q&A UI
+# --------------------------
+
+elif "Corpus" in app_mode:
+    st.markdown("## Corpus Interrogation")
+
+    # Sidebar corpus input: a folder or .zip of PDF/DOCX/PPTX/TXT files under the corpus root
+    st.sidebar.header("Corpus Input")
+    corpus_path = st.sidebar.text_input("Folder or .zip path", placeholder="contracts",
+                                        help="Relative to the corpus root set in ASTRADOC_CORPUS_ROOT")
+
+    if st.sidebar.button("Ingest Corpus", type="primary"):
+        try:
+            source = corpus.resolve_source(corpus_path)
+            with st.spinner("Indexing corpus (only new or changed files are processed)..."):
+                stats = corpus.ingest_corpus(source)
+        except (ValueError, OSError, sqlite3.Error, zipfile.BadZipFile) as e:
+            st.error(f"Could not ingest corpus: {e}")
+            st.stop()
+        st.session_state.corpus_index = corpus.default_index_path(source)
+        st.success(
+            f"Corpus indexed: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['removed']} removed, {stats['failed']} failed"
+        )
+
+    if st.session_state.corpus_index:
+        files = corpus.corpus_files(st.session_state.corpus_index)
+        st.caption(f"{len(files)} files indexed")
+        question = st.text_input("Ask across all documents:")
+
+        if question:
+            if stream_responses:
+                st.success("Verified Answer:")
+                placeholder = st.empty()
+                answer, sources = answer_corpus_question(
+                    st.session_state.corpus_index, question, on_token=render_tokens(placeholder)
+                )
+                placeholder.info(answer)
+            else:
+                with st.spinner("Searching the corpus..."):
+                    answer, sources = answer_corpus_question(st.session_state.corpus_index, question)
+                st.success("Verified Answer:")
+                st.info(answer)
+            if sources:
+                st.markdown("**Sources:** " + ", ".join(f"`{path}`" for path in sources))
 
 # --------------------------
 # 📄 Document Intelligence UI
 # --------------------------
 
 else:
-    if not st.session_state.doc_session.get("processed_text"):
+    if not st.session_state.doc_session.get("document") and not st.session_state.doc_session.get("ingestion"):
         # Introductory hero section
         st.markdown(f"""
         <div style='text-align: center; margin-bottom: 2rem;'>
@@ -212,71 +296,224 @@ else:
     if input_mode == "Upload File":
         uploaded_file = st.sidebar.file_uploader(
             "Select file",
-            type=["pdf", "txt", "docx", "pptx"],
+            type=extract.supported_extensions(),
             label_visibility="collapsed"
         )
     else:
-        url_input = st.sidebar.text_input("Document URL", placeholder="https://...")
+        url_input = st.sidebar.text_area("Document URLs (one per line)", placeholder="https://...")
+
+    cache_stats = extraction_cache.get_stats()
+    st.sidebar.caption(
+        f"Extraction cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+        f"{cache_stats['entries']} files ({cache_stats['bytes'] / 1e6:.1f} MB)"
+    )
 
     # Trigger document processing
     if st.sidebar.button("Process Document", type="primary"):
+        # Work on the previous document is no longer wanted
+        for job_key in ("speculative", "ingestion"):
+            if st.session_state.doc_session.get(job_key):
+                st.session_state.doc_session[job_key].cancel()
+                st.session_state.doc_session[job_key] = None
+
         with st.spinner("Analyzing document..."):
+            text = None
             if input_mode == "Upload File" and uploaded_file:
                 file_ext = uploaded_file.name.split('.')[-1].lower()
-                if file_ext == "pdf":
-                    text = extract.extract_text_from_pdf(uploaded_file)
-                elif file_ext == "txt":
-                    text = extract.extract_text_from_txt(uploaded_file)
-                elif file_ext == "docx":
-                    text = extract.extract_text_from_docx(uploaded_file)
-                elif file_ext == "pptx":
-                    text = extract.extract_text_from_pptx(uploaded_file)
-                else:
+                if file_ext not in extract.supported_extensions():
                     st.error("Unsupported file format")
                     st.stop()
-            elif url_input:
-                text = extract.extract_text_from_url(url_input)
+                # Large PDFs are parsed in the background, so work can start on the first pages
+                st.session_state.doc_session["ingestion"] = ingestion.start_if_large(uploaded_file, file_ext)
+                if st.session_state.doc_session["ingestion"] is None:
+                    # Re-uploads of the same bytes are served from the cache without parsing
+                    text = extraction_cache.cached_extract(
+                        uploaded_file,
+                        file_ext,
+                        lambda file: extract.extract_text(file, file_ext),
+                        extract.EXTRACTOR_VERSION
+                    )
+            elif url_input.strip():
+                urls = [line.strip() for line in url_input.splitlines() if line.strip()]
+                # Several URLs are fetched and parsed concurrently and combined into one document
+                text = "\n".join(extract.extract_text_from_urls(urls))
             else:
                 st.error("No input provided")
                 st.stop()
 
-            # Store extracted text in session
-            st.session_state.doc_session["processed_text"] = text
-            st.session_state.doc_session["qa_ready"] = True
-            st.success("Document processed successfully!")
+            st.session_state.doc_session["summary"] = {}  # Summaries belong to the previous document
+            st.session_state.doc_session["checklist"] = None
+            if text is not None:
+                # The text is stored once per digest and shared by every session; this one keeps a handle
+                set_document(document_store.put_text(text))
+                del text
+                st.success("Document processed successfully!")
+            else:
+                st.session_state.doc_session["document"] = None  # Set when the background ingestion finishes
+
+    # Progress of a background PDF ingestion; the rest of the page works on the pages done so far
+    ingestion_job = st.session_state.doc_session.get("ingestion")
+    if ingestion_job:
+        ingestion_progress()
+        document = ingestion_job.document()
+    else:
+        document = st.session_state.doc_session.get("document")
+    if ingestion_job and document is None:
+        st.info("Extracting the first pages...")
 
     # Document summary or Q&A operations
-    if st.session_state.doc_session.get("processed_text"):
+    if document:
         st.sidebar.header("Analysis Tools")
-        operation = st.sidebar.radio("Operation", ["📝 Summarize", "❓ Document Q&A"], index=0)
+        operation = st.sidebar.radio("Operation", ["📝 Summarize", "❓ Document Q&A", "📋 Batch Q&A"], index=0)
+        if ingestion_job:
+            st.caption(
+                f"Working on pages 1–{ingestion_job.pages_done} of {ingestion_job.page_count}; "
+                "results cover the pages extracted when you ask."
+            )
 
         # 📝 Summarization UI
         if "Summarize" in operation:
             st.markdown("## Executive Summary")
             summary_type = st.selectbox("Summary Style", ["Brief", "Detailed", "Key Points"], index=0)
-
-            if st.button("Generate Summary"):
-                with st.spinner("Creating professional summary..."):
-                    summary = summarize_file(
-                        st.session_state.doc_session["processed_text"],
-                        summary_type
+            # Optional local pre-summarization: long documents keep only their most informative sentences
+            condense_options = {"Off": None, "Keep 60%": 0.6, "Keep 40%": 0.4, "Keep 25%": 0.25}
+            condense_choice = st.select_slider("Local pre-summarization", options=list(condense_options))
+            keep_ratio = condense_options[condense_choice]
+            summary_key = (summary_type, keep_ratio, document.digest)  # Partial documents have their own digest
+
+            summaries = st.session_state.doc_session["summary"]
+            if st.button("Generate Summary") and summary_key not in summaries:
+                stats = {}  # Filled with chunk, model-call and reuse counts
+                summary = None
+                job = st.session_state.doc_session.get("speculative")
+                if job and summary_key == (job.summary_type, None, job.digest):
+                    if job.done():
+                        summary = job.result()  # None if it was cancelled or failed
+                        if summary is not None:
+                            stats = job.stats
+                    else:
+                        # Don't wait on the background job's few workers: stop it and summarize at full
+                        # concurrency below; the chunks it already finished come from the summary store
+                        job.cancel()
+
+                if summary is not None:
+                    summaries[summary_key] = summary
+                elif stream_responses:
+                    summaries[summary_key] = summarize_file_streaming(
+                        document,
+                        summary_type,
+                        keep_ratio,
+                        stats
                     )
-                    st.session_state.doc_session["summary"] = summary
-                st.text_area("Summary", value=summary, height=300, label_visibility="collapsed")
+                else:
+                    with st.spinner("Creating professional summary..."):
+                        summaries[summary_key] = summarize_file(
+                            document,
+                            summary_type,
+                            keep_ratio=keep_ratio,
+                            stats=stats
+                        )
+                if stats:
+                    st.caption(
+                        f"{stats['calls_saved']} of {stats['chunks']} section summaries reused without a model call "
+                        f"({stats['stored']} stored, {stats['within_document']} repeated in this document, "
+                        f"{stats['across_documents']} near-duplicates of other documents)"
+                    )
+            # Show the session's summary for this style once it has been generated
+            if summary_key in summaries:
+                st.text_area("Summary", value=summaries[summary_key], height=300, label_visibility="collapsed")
 
         # ❓ Q&A UI
-        elif "Q&A" in operation:
+        elif operation == "❓ Document Q&A":
             st.markdown("## Document Interrogation")
             question = st.text_input("Ask about the document content:")
 
             if question and st.session_state.doc_session["qa_ready"]:
-                with st.spinner("Extracting precise answer..."):
+                if stream_responses:
+                    st.success("Verified Answer:")
+                    placeholder = st.empty()
                     answer = find_answer_in_text(
-                        st.session_state.doc_session["processed_text"],
-                        question
+                        document,
+                        question,
+                        core.document_index(document),
+                        on_token=render_tokens(placeholder),
+                        digest=document.digest
                     )
-                st.success("Verified Answer:")
-                st.info(answer)
+                    placeholder.info(answer)
+                else:
+                    with st.spinner("Extracting precise answer..."):
+                        answer = find_answer_in_text(
+                            document,
+                            question,
+                            core.document_index(document),
+                            digest=document.digest
+                        )
+                    st.success("Verified Answer:")
+                    st.info(answer)
+
+            answer_stats = answer_cache.get_stats()
+            st.caption(
+                f"Answer cache: {answer_stats['hits']} hits / {answer_stats['misses']} misses, "
+                f"{answer_stats['entries']} answers"
+            )
+
+        # 📋 Batch Q&A UI: a checklist of questions answered over one retrieval pass
+        elif "Batch" in operation:
+            st.markdown("## Checklist Review")
+            checklist = st.text_area("Questions (one per line):", height=200)
+            questions = [line.strip() for line in checklist.splitlines() if line.strip()]
+
+            if st.button("Answer All") and questions and st.session_state.doc_session["qa_ready"]:
+                stats = {}  # Filled with cached and model-call counts
+                with st.spinner(f"Answering {len(questions)} questions..."):
+                    answers = core.answer_questions(
+                        document,
+                        questions,
+                        core.document_index(document),
+                        digest=document.digest,
+                        stats=stats
+                    )
+                st.session_state.doc_session["checklist"] = (document.digest, list(zip(questions, answers)))
+                st.caption(
+                    f"{stats['questions']} questions: {stats['cached']} from the answer cache, "
+                    f"the rest in {stats['model_calls']} model calls"
+                )
+
+            results = st.session_state.doc_session["checklist"]
+            if results and results[0] == document.digest:
+                st.table([{"Question": question, "Answer": answer} for question, answer in results[1]])
+
+# --------------------------
+# 📈 Model Usage Panel
+# --------------------------
+
+# The all-sessions aggregate reads up to a day of records, so it is computed at most
+# once per USAGE_TTL_SECONDS for every session instead of on each rerun
+@st.cache_data(ttl=USAGE_TTL_SECONDS, show_spinner=False)
+def recent_usage(window_seconds):
+    return metrics.get_summary(since=time.time() - window_seconds)
+
+# Latency percentiles and token totals, for this session and for all sessions in the last 24 hours
+with st.sidebar.expander("📈 Model usage"):
+    for label, usage in (
+        ("This session", metrics.get_summary(session=st.session_state.session_id)),  # Indexed by session
+        ("All sessions, 24 h", recent_usage(24 * 3600)),
+    ):
+        st.markdown(f"**{label}**")
+        if not usage["all"]["calls"]:
+            st.caption("No model calls yet")
+            continue
+        rows = []
+        for stage, stats in sorted(usage.items(), key=lambda item: item[0] != "all"):
+            ttft = f"{stats['ttft_p50']:.2f} s" if stats["ttft_p50"] is not None else "–"
+            latency = f"{stats['p50']:.2f} / {stats['p95']:.2f} s" if stats["p50"] is not None else "–"
+            rows.append(
+                f"| {stage} | {stats['calls']} | {latency} | {ttft} "
+                f"| {stats['prompt_tokens']:,} / {stats['completion_tokens']:,} |"
+            )
+        st.markdown(
+            "| Stage | Calls | p50 / p95 | TTFT p50 | Tokens in / out |\n|---|---|---|---|---|\n" + "\n".join(rows)
+        )
 
 # --------------------------
 # 🔚 Footer Section
@@ -0,0 +1,494 @@
+# Offline benchmarks for AstraDoc's document processing stages
+# Usage: python benchmark.py chunk --pages 1000
+#        python benchmark.py pdf --pages 500
+#        python benchmark.py clean --megabytes 8
+#        python benchmark.py pipeline --pages 10 100 1000 --latency 0.2 --tokens-per-second 200
+#        python benchmark.py condense --ratios 0.6 0.4 0.25 [--files report.pdf handbook.docx]
+#        python benchmark.py sessions --pages 2000 --sessions 1 10 50
+#        python benchmark.py importtime --budget-ms 150
+import argparse  # Command-line argument parsing
+import io  # In-memory buffers standing in for Streamlit uploads
+import os  # Temporary file handling for the legacy PDF path
+import random  # Deterministic synthetic document generation
+import re  # The legacy cleaning loop's uncompiled patterns
+import subprocess  # Fresh interpreters for import-time measurements
+import sys  # Interpreter path and exit status
+import tempfile  # Scratch directory for the legacy PDF path
+import textwrap  # Page-like line wrapping for the cleaning benchmark
+import time  # High-resolution timers
+import tracemalloc  # Python heap measurements for the session memory benchmark
+
+from chunker import chunk_text, count_tokens  # Chunker under test
+
+# ================================
+# --- Synthetic Documents ---
+# ================================
+WORDS = (
+    "agreement party shall provide services within thirty days notice payment invoice "
+    "liability clause termination confidential information obligations warranty period "
+    "customer supplier delivery schedule amendment governing law jurisdiction revenue "
+    "quarter growth strategy market analysis forecast budget compliance audit report"
+).split()
+
+
+def generate_document(pages, seed=42, lines_per_page=40):
+    # Build a reproducible document with sentence and paragraph structure
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(pages * lines_per_page // 4):
+        sentences = []
+        for _ in range(rng.randint(2, 6)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(6, 24))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        lines.append(" ".join(sentences))
+    return "\n".join(lines) + "\n"
+
+
+def generate_pdf(pages, seed=42, lines_per_page=40):
+    # Build a minimal, valid text PDF (Helvetica, one content stream per page)
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for _ in range(pages):
+        commands = ["BT /F1 10 Tf 40 800 Td 12 TL"]
+        for _ in range(lines_per_page):
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+            commands.append(f"({words.capitalize()}.) Tj T*")
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+# ================================
+# --- Chunker Benchmark ---
+# ================================
+def legacy_chunk_text(text, max_tokens=3000, overlap=500):
+    # The original fixed-size character chunker, kept here as the baseline
+    chunk_size = max_tokens * 4
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size - overlap)]
+
+
+def chunk_stats(name, chunks, max_tokens, elapsed):
+    # Report chunk count, budget utilisation and boundary quality
+    tokens = [count_tokens(chunk) for chunk in chunks]
+    over = sum(1 for t in tokens if t > max_tokens)
+    mid_sentence = sum(1 for chunk in chunks if not chunk.rstrip().endswith((".", "!", "?")))
+    utilisation = sum(min(t, max_tokens) for t in tokens) / (len(tokens) * max_tokens) if tokens else 0
+    print(
+        f"{name:<8} chunks={len(chunks):<6} tokens_sent={sum(tokens):<9} "
+        f"utilisation={utilisation:6.1%} over_budget={over:<4} "
+        f"cut_mid_sentence={mid_sentence:<5} time={elapsed * 1000:8.1f} ms"
+    )
+
+
+def bench_chunk(args):
+    for pages in args.pages:
+        text = generate_document(pages)
+        print(f"\n== {pages} pages, {len(text):,} chars, {count_tokens(text):,} tokens ==")
+
+        start = time.perf_counter()
+        chunks = legacy_chunk_text(text, args.max_tokens)
+        chunk_stats("legacy", chunks, args.max_tokens, time.perf_counter() - start)
+
+        count_tokens.cache_clear()  # Time the new chunker without warm sentence counts
+        start = time.perf_counter()
+        chunks = list(chunk_text(text, args.max_tokens, args.overlap))
+        chunk_stats("chunker", chunks, args.max_tokens, time.perf_counter() - start)
+
+# ================================
+# --- PDF Extraction Benchmark ---
+# ================================
+def legacy_extract_pdf(pdf_bytes, directory):
+    # The original path: write the upload to a temp file, then load every page sequentially
+    path = os.path.join(directory, "temp_uploaded_file.pdf")
+    with open(path, "wb") as f:
+        f.write(pdf_bytes)
+    try:
+        from langchain_community.document_loaders import PyPDFLoader
+        pages = [doc.page_content for doc in PyPDFLoader(path).load()]
+    except ImportError:
+        from pypdf import PdfReader
+        pages = [page.extract_text() for page in PdfReader(path).pages]
+    return "\n".join(line.strip() for page in pages for line in page.split("\n") if line.strip())
+
+
+def bench_pdf(args):
+    import extract  # Imported here so the chunk benchmark runs without extractor backends
+
+    for pages in args.pages:
+        pdf_bytes = generate_pdf(pages)
+        print(f"\n== {pages} pages, {len(pdf_bytes) / 1e6:.1f} MB ==")
+
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            legacy_extract_pdf(pdf_bytes, directory)
+            elapsed = time.perf_counter() - start
+        print(f"legacy     {pages / elapsed:8.1f} pages/s  time={elapsed:6.2f} s")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            extract.extract_text_from_pdf(io.BytesIO(pdf_bytes), max_workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers:<3}{pages / elapsed:8.1f} pages/s  time={elapsed:6.2f} s")
+
+# ================================
+# --- Cleaning Stage Benchmark ---
+# ================================
+def legacy_clean(text):
+    # The original per-extractor loop: uncompiled patterns per line and += concatenation
+    unwanted_patterns = [r'.*indd.*', r'^\s+$']
+    full_text = ""
+    for line in text.split('\n'):
+        stripped_line = line.strip()
+        if any(re.match(pattern, stripped_line) for pattern in unwanted_patterns):
+            continue
+        if stripped_line:
+            full_text += stripped_line + "\n"
+    return full_text
+
+
+def bench_clean(args):
+    import extract
+
+    for megabytes in args.megabytes:
+        # Mix in blank, whitespace-only and InDesign tag lines for the filter to drop
+        # Wrap paragraphs into ~80-character lines, like text extracted from PDF pages
+        text = generate_document(max(1, int(megabytes * 1e6 / 5300)))
+        lines = [line for paragraph in text.split("\n") for line in textwrap.wrap(paragraph, 80)]
+        for index in range(0, len(lines), 7):
+            lines[index] = "   " if index % 2 else f"  Layout_{index}.indd  Page {index}  "
+        text = "\n".join(lines)
+        print(f"\n== {len(text) / 1e6:.1f} MB, {len(lines):,} lines ==")
+
+        start = time.perf_counter()
+        legacy = legacy_clean(text)
+        legacy_elapsed = time.perf_counter() - start
+        print(f"legacy   time={legacy_elapsed * 1000:8.1f} ms")
+
+        start = time.perf_counter()
+        cleaned = extract.join_lines(extract.clean_lines(io.StringIO(text)))
+        elapsed = time.perf_counter() - start
+        print(f"pipeline time={elapsed * 1000:8.1f} ms  speedup={legacy_elapsed / elapsed:5.1f}x  "
+              f"identical={cleaned == legacy}")
+
+# ================================
+# --- End-to-End Pipeline Benchmark ---
+# ================================
+def generate_docx(text):
+    from docx import Document
+    doc = Document()
+    for line in text.splitlines():
+        doc.add_paragraph(line)
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+
+def generate_pptx(text, paragraphs_per_slide=10):
+    from pptx import Presentation
+    from pptx.util import Inches
+    prs = Presentation()
+    lines = text.splitlines()
+    for start in range(0, len(lines), paragraphs_per_slide):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(6))
+        box.text_frame.text = "\n".join(lines[start:start + paragraphs_per_slide])
+    out = io.BytesIO()
+    prs.save(out)
+    return out.getvalue()
+
+
+class StageTimer:
+    # Time one stage and report the stub's call and token counters for it
+    def __init__(self, stub, name, rows):
+        self.stub, self.name, self.rows = stub, name, rows
+
+    def __enter__(self):
+        self.stub.reset()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.rows.append((self.name, time.perf_counter() - self.start, self.stub.calls,
+                          self.stub.prompt_tokens, self.stub.completion_tokens))
+
+
+def bench_pipeline(args):
+    from stub_llm import StubLLMServer
+
+    stub = StubLLMServer(args.latency, args.tokens_per_second, args.reply_tokens).start()
+    with tempfile.TemporaryDirectory() as directory:
+        # Point every store at a scratch directory so no run is served from an earlier cache
+        import summary_store, extraction_cache, http_cache, answer_cache, metrics, document_store
+        summary_store.DB_PATH = os.path.join(directory, "summaries.db")
+        extraction_cache.DB_PATH = os.path.join(directory, "extractions.db")
+        http_cache.DB_PATH = os.path.join(directory, "http.db")
+        answer_cache.DB_PATH = os.path.join(directory, "answers.db")
+        metrics.DB_PATH = os.path.join(directory, "metrics.db")  # Stub calls stay out of the usage panel
+        document_store.STORE_DIR = os.path.join(directory, "documents")
+
+        # core builds its OpenAI client from these at import time
+        os.environ["NVIDIA_BASE_URL"] = stub.base_url
+        os.environ["NVIDIA_API_KEY"] = "stub"
+        import core
+        import extract
+        from memory import ConversationMemory
+        core.init_stores()
+
+        for pages in args.pages:
+            text = generate_document(pages)
+            rows = []
+            print(f"\n== {pages} pages, {count_tokens(text):,} tokens ==")
+
+            files = {"pdf": generate_pdf(pages), "txt": text.encode("utf-8"),
+                     "docx": generate_docx(text), "pptx": generate_pptx(text)}
+            for ext, data in files.items():
+                with StageTimer(stub, f"extract_text_from_{ext}", rows):
+                    extract.extract_text(io.BytesIO(data), ext)
+
+            with StageTimer(stub, "chunk_text", rows):
+                list(chunk_text(text, core.MAX_TOKENS, core.OVERLAP))
+            with StageTimer(stub, "summarize_file (cold)", rows):
+                core.summarize_file(text, "Brief")
+            with StageTimer(stub, "summarize_file (stored)", rows):
+                core.summarize_file(text, "Brief")
+            with StageTimer(stub, "find_answer_in_text x5", rows):
+                index = core.BM25Index.from_text(text)
+                for question in ("What is the payment schedule?", "Who is liable?", "What is the warranty period?",
+                                 "What is the governing law?", "When can the agreement be terminated?"):
+                    core.find_answer_in_text(text, question, index)
+            with StageTimer(stub, f"chat_with_ai x{args.chat_turns}", rows):
+                history, memory = [], ConversationMemory(core.summarize_conversation)
+                for turn in range(args.chat_turns):
+                    core.chat_with_ai(history, memory, f"Question {turn}: " + text[turn * 400:(turn + 1) * 400])
+
+            print(f"{'stage':<26}{'time (s)':>10}{'calls':>8}{'prompt tok':>12}{'output tok':>12}")
+            for name, elapsed, calls, prompt_tokens, completion_tokens in rows:
+                print(f"{name:<26}{elapsed:>10.2f}{calls:>8}{prompt_tokens:>12,}{completion_tokens:>12,}")
+    stub.stop()
+
+# ================================
+# --- Pre-summarization Benchmark ---
+# ================================
+BOILERPLATE = [
+    "Confidential and proprietary. Do not distribute without written consent.",
+    "Copyright Northwind Holdings Ltd. All rights reserved.",
+]
+
+
+def generate_report(sections, seed=42, paragraphs_per_section=12):
+    # A reproducible report: every section has its own vocabulary, and a header and
+    # footer are repeated between paragraphs like text extracted from paged documents.
+    # Returns the text and, per section, the set of terms unique to it.
+    rng = random.Random(seed)
+    lines, topics = [], []
+    for section in range(sections):
+        terms = [f"item{section}x{term}" for term in range(6)]  # Appear only in this section
+        topic = rng.sample(WORDS, 8) + terms
+        topics.append(set(terms))
+        lines.append(f"Section {section + 1}.")
+        for paragraph in range(paragraphs_per_section):
+            sentences = []
+            for _ in range(rng.randint(3, 6)):
+                words = [rng.choice(topic) if rng.random() < 0.6 else rng.choice(WORDS)
+                         for _ in range(rng.randint(8, 20))]
+                sentences.append(" ".join(words).capitalize() + ".")
+            lines.append(" ".join(sentences))
+            if paragraph % 4 == 3:
+                lines.extend(BOILERPLATE)
+    return "\n".join(lines) + "\n", topics
+
+
+def condense_quality(name, original, condensed, topics, elapsed):
+    # Report tokens and map calls saved against how much content survives
+    from retrieval import tokenize
+    import core
+
+    original_terms, kept_terms = set(tokenize(original)), set(tokenize(condensed))
+    tokens = count_tokens(condensed)
+    chunks = len(list(chunk_text(condensed, core.MAX_TOKENS, core.OVERLAP)))
+    line = (f"{name:<18} tokens={tokens:<8,} ({tokens / count_tokens(original):5.1%}) map_calls={chunks:<4} "
+            f"term_recall={len(kept_terms & original_terms) / len(original_terms):6.1%} ")
+    if topics:
+        covered = sum(1 for topic in topics if len(topic & kept_terms) >= len(topic) // 2)
+        boilerplate = sum(condensed.count(sentence) for sentence in BOILERPLATE)
+        line += f"sections_covered={covered / len(topics):6.1%} boilerplate_kept={boilerplate:<4} "
+    print(line + f"time={elapsed * 1000:7.1f} ms")
+
+
+def bench_condense(args):
+    import extract
+    from extractive import condense
+
+    # The fixed document set: given files, or synthetic reports of increasing length
+    documents = []
+    for path in args.files or []:
+        with open(path, "rb") as f:
+            text = extract.extract_text(io.BytesIO(f.read()), path.rsplit(".", 1)[-1].lower())
+        documents.append((os.path.basename(path), text, None))
+    if not args.files:
+        for sections in args.sections:
+            text, topics = generate_report(sections)
+            documents.append((f"report ({sections} sections)", text, topics))
+
+    for name, text, topics in documents:
+        print(f"\n== {name}: {count_tokens(text):,} tokens ==")
+        condense_quality("original", text, text, topics, 0.0)
+        for ratio in args.ratios:
+            start = time.perf_counter()
+            condensed = condense(text, ratio, min_tokens=0)
+            condense_quality(f"tfidf keep {ratio:.0%}", text, condensed, topics, time.perf_counter() - start)
+            # Baseline: the same share of the document, taken from the start
+            condense_quality(f"lead  keep {ratio:.0%}", text, text[:int(len(text) * ratio)], topics, 0.0)
+
+# ================================
+# --- Session Memory Benchmark ---
+# ================================
+def bench_sessions(args):
+    # Python heap held by N sessions on the same document: a private text copy and retrieval
+    # index per session (the old layout) against shared document store handles
+    from retrieval import BM25Index
+
+    text = generate_document(args.pages)
+    print(f"== {args.pages} pages, {len(text) / 1e6:.1f} MB of text ==")
+    with tempfile.TemporaryDirectory() as directory:
+        import document_store
+        import core
+        document_store.STORE_DIR = directory
+
+        for sessions in args.sessions:
+            tracemalloc.start()
+            private = []
+            for _ in range(sessions):
+                copy = "".join(io.StringIO(text))  # Each session's own extraction result
+                private.append({"processed_text": copy, "index": BM25Index.from_text(copy)})
+            private_bytes = tracemalloc.get_traced_memory()[0]
+            del private
+            tracemalloc.stop()
+
+            core._indexes.clear()
+            tracemalloc.start()
+            shared = []
+            for _ in range(sessions):
+                document = document_store.put_text("".join(io.StringIO(text)))
+                core.document_index(document)
+                shared.append({"document": document})
+            shared_bytes = tracemalloc.get_traced_memory()[0]
+            del shared
+            tracemalloc.stop()
+            print(f"{sessions:>4} sessions  private={private_bytes / 1e6:9.1f} MB  shared={shared_bytes / 1e6:9.1f} MB")
+
+# ================================
+# --- Import Time ---
+# ================================
+def measure_import(module):
+    # Import `module` in a fresh interpreter under -X importtime. Returns its cumulative
+    # time in microseconds and the (cumulative microseconds, name) of everything it imported.
+    env = dict(os.environ)
+    env.setdefault("NVIDIA_API_KEY", "importtime")  # core builds its client at import time
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)), env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.rstrip()))
+
+    # Children are listed before their parent, between it and the previous top-level import
+    end = max(i for i, (_, name) in enumerate(imports) if name == f" {module}")
+    start = max((i for i, (_, name) in enumerate(imports[:end]) if not name.startswith("  ")), default=-1) + 1
+    return imports[end][0], imports[start:end]
+
+
+def bench_importtime(args):
+    # Fails (exit status 1) when a module's cold import exceeds the budget
+    over_budget = False
+    for module in args.modules:
+        # Best of several runs; the first is skewed by a cold filesystem cache
+        total, imports = min((measure_import(module) for _ in range(args.runs)), key=lambda run: run[0])
+        status = "ok" if total <= args.budget_ms * 1000 else "OVER BUDGET"
+        over_budget |= status != "ok"
+        print(f"\n== import {module}: {total / 1000:.1f} ms (budget {args.budget_ms} ms) {status} ==")
+        # Heaviest direct dependencies of the module
+        direct = [(cumulative, name) for cumulative, name in imports if not name.startswith("    ")]
+        for cumulative, name in sorted(direct, reverse=True)[:args.top]:
+            print(f"{cumulative / 1000:>10.1f} ms  {name.strip()}")
+    if over_budget:
+        sys.exit(1)
+
+# ================================
+# --- Entry Point ---
+# ================================
+def main():
+    parser = argparse.ArgumentParser(description="AstraDoc offline benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    chunk_parser = subparsers.add_parser("chunk", help="Compare chunk_text against the legacy chunker")
+    chunk_parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    chunk_parser.add_argument("--max-tokens", type=int, default=3000)
+    chunk_parser.add_argument("--overlap", type=int, default=125)
+    chunk_parser.set_defaults(func=bench_chunk)
+
+    pdf_parser = subparsers.add_parser("pdf", help="Compare PDF extraction against the temp-file path")
+    pdf_parser.add_argument("--pages", type=int, nargs="+", default=[100, 500])
+    pdf_parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    pdf_parser.set_defaults(func=bench_pdf)
+
+    clean_parser = subparsers.add_parser("clean", help="Compare the cleaning stage against the legacy loop")
+    clean_parser.add_argument("--megabytes", type=float, nargs="+", default=[1, 8])
+    clean_parser.set_defaults(func=bench_clean)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Time every stage against a local stub LLM server")
+    pipeline_parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    pipeline_parser.add_argument("--latency", type=float, default=0.2, help="Stub time-to-first-token (s)")
+    pipeline_parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Stub generation speed")
+    pipeline_parser.add_argument("--reply-tokens", type=int, default=120, help="Stub completion length")
+    pipeline_parser.add_argument("--chat-turns", type=int, default=20)
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    condense_parser = subparsers.add_parser("condense", help="Tokens saved vs content kept by pre-summarization")
+    condense_parser.add_argument("--ratios", type=float, nargs="+", default=[0.6, 0.4, 0.25])
+    condense_parser.add_argument("--sections", type=int, nargs="+", default=[10, 50, 200])
+    condense_parser.add_argument("--files", nargs="+", help="Measure these documents instead of synthetic reports")
+    condense_parser.set_defaults(func=bench_condense)
+
+    sessions_parser = subparsers.add_parser("sessions", help="Per-session memory with and without the document store")
+    sessions_parser.add_argument("--pages", type=int, default=500)
+    sessions_parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    sessions_parser.set_defaults(func=bench_sessions)
+
+    importtime_parser = subparsers.add_parser("importtime", help="Check cold-import time against a budget")
+    importtime_parser.add_argument("--modules", nargs="+", default=["extract"])
+    importtime_parser.add_argument("--budget-ms", type=float, default=150.0)
+    importtime_parser.add_argument("--runs", type=int, default=3)
+    importtime_parser.add_argument("--top", type=int, default=8, help="Heaviest dependencies to list")
+    importtime_parser.set_defaults(func=bench_importtime)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# Import required modules and libraries
+import io  # For iterating over large strings line by line without copying
+import re  # Regular expressions module
+import zlib  # Fast, process-stable checksums for content-defined chunk boundaries
+from functools import lru_cache  # Memoize token counts of repeated sentences
+
+# ================================
+# --- Token Counting ---
+# ================================
+ENCODING_NAME = "cl100k_base"  # tiktoken encoding used when the package is available
+ANCHOR_RATE = 8  # One paragraph end in this many may close a chunk early (see _is_anchor)
+CACHE_SIZE = 65536  # Number of distinct sentences whose token counts are memoized
+
+_encoding = None  # Lazily loaded tiktoken encoding (False when unavailable)
+
+# Pieces the fallback estimator counts: words, numbers and single punctuation marks
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Sentence boundaries: end punctuation (optionally followed by quotes/brackets) and whitespace
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+
+def _get_encoding():
+    # Load the tokenizer once; fall back to the estimator if tiktoken is missing or offline
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def estimate_tokens(text):
+    # Calibrated estimate: BPE tokenizers emit about one token per short word or punctuation
+    # mark, and roughly one extra token for every 6 characters of longer words
+    return sum(1 + (len(piece) - 1) // 6 for piece in _PIECE_PATTERN.findall(text))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def count_tokens(text):
+    # Count tokens with the real tokenizer when available, otherwise estimate
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+# ================================
+# --- Sentence Splitting ---
+# ================================
+def _split_long_sentence(sentence, max_tokens):
+    # Break a sentence that alone exceeds the budget on word boundaries
+    piece, piece_tokens = [], 0
+    for word in sentence.split():
+        tokens = count_tokens(word) + 1  # +1 for the joining space
+        if piece and piece_tokens + tokens > max_tokens:
+            yield " ".join(piece)
+            piece, piece_tokens = [], 0
+        piece.append(word)
+        piece_tokens += tokens
+    if piece:
+        yield " ".join(piece)
+
+
+def iter_units(lines, max_tokens):
+    # Yield (sentence, tokens, ends_paragraph) for every sentence in the input lines
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        sentences = [s for s in _SENTENCE_PATTERN.split(line) if s]
+        for index, sentence in enumerate(sentences):
+            last = index == len(sentences) - 1
+            tokens = count_tokens(sentence)
+            if tokens <= max_tokens:
+                yield sentence, tokens, last
+                continue
+            pieces = list(_split_long_sentence(sentence, max_tokens))
+            for piece_index, piece in enumerate(pieces):
+                yield piece, count_tokens(piece), last and piece_index == len(pieces) - 1
+
+# ================================
+# --- Chunking ---
+# ================================
+def _join_units(units):
+    # Sentences of one paragraph are joined by spaces, paragraphs by newlines
+    parts = []
+    for sentence, _, ends_paragraph in units:
+        parts.append(sentence)
+        parts.append("\n" if ends_paragraph else " ")
+    return "".join(parts).strip()
+
+
+def _overlap_tail(units, overlap):
+    # Trailing sentences worth up to `overlap` tokens, carried into the next chunk
+    tail, tail_tokens = [], 0
+    for unit in reversed(units):
+        if tail_tokens + unit[1] > overlap:
+            break
+        tail.insert(0, unit)
+        tail_tokens += unit[1]
+    return tail
+
+
+def _is_anchor(unit):
+    # Content-defined boundary: roughly one paragraph end in ANCHOR_RATE is an anchor.
+    # Cutting at anchors lets a revised document re-align with the original's chunks
+    # right after an edit, so unchanged chunks hash the same and can be reused.
+    return unit[2] and zlib.crc32(unit[0].encode("utf-8")) % ANCHOR_RATE == 0
+
+
+def chunk_text(text, max_tokens=3000, overlap=125):
+    """
+    Split text into chunks of at most max_tokens tokens, breaking on paragraph
+    and sentence boundaries. Consecutive chunks share up to `overlap` tokens of
+    trailing sentences. `text` may be a string or any iterable of lines, and
+    chunks are yielded lazily so large documents are never copied whole.
+    """
+    lines = io.StringIO(text) if isinstance(text, str) else text
+    overlap = min(overlap, max_tokens // 2)  # Overlap must leave room for new content
+    anchor_tokens = max_tokens * 3 // 4  # Anchors only cut chunks that are already well filled
+
+    current, current_tokens = [], 0
+    paragraph_end = None  # Index just after the last paragraph boundary in `current`
+    carried = 0  # Number of leading units in `current` that came from the overlap
+
+    for unit in iter_units(lines, max_tokens):
+        tokens = unit[1]
+        if current and current_tokens + tokens > max_tokens:
+            # Prefer cutting at a paragraph boundary when it keeps at least half the budget
+            cut = len(current)
+            if paragraph_end and paragraph_end > carried:
+                if sum(u[1] for u in current[:paragraph_end]) >= max_tokens // 2:
+                    cut = paragraph_end
+            yield _join_units(current[:cut])
+
+            # Start the next chunk with the overlap and any sentences left after the cut
+            tail = _overlap_tail(current[:cut], overlap)
+            current = tail + current[cut:]
+            carried = len(tail)
+            current_tokens = sum(u[1] for u in current)
+
+            # Make room for the incoming sentence: drop carried overlap first; sentences left
+            # after the cut were never emitted, so if they still don't fit they become a chunk
+            while current and current_tokens + tokens > max_tokens:
+                if carried:
+                    current_tokens -= current.pop(0)[1]
+                    carried -= 1
+                else:
+                    yield _join_units(current)
+                    current = _overlap_tail(current, overlap)
+                    carried = len(current)
+                    current_tokens = sum(u[1] for u in current)
+
+            paragraph_end = None
+            for index, previous in enumerate(current):
+                if previous[2]:
+                    paragraph_end = index + 1
+
+        current.append(unit)
+        current_tokens += tokens
+        if unit[2]:
+            paragraph_end = len(current)
+
+        if current_tokens >= anchor_tokens and len(current) > carried and _is_anchor(unit):
+            yield _join_units(current)
+            current = _overlap_tail(current, overlap)
+            carried = len(current)
+            current_tokens = sum(u[1] for u in current)
+            paragraph_end = None
+
+    if len(current) > carried:
+        yield _join_units(current)
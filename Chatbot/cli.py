@@ -0,0 +1,152 @@
+# Headless AstraDoc: summarize and question a directory of documents without the UI.
+# Usage: python cli.py ./nightly_drop --out results.jsonl --summary-type Brief \
+#            --questions checklist.txt --processes 4 --llm-concurrency 16
+import argparse  # Command-line argument parsing
+import hashlib  # File digests for resume checkpoints
+import io  # In-memory buffers handed to the extractors
+import json  # JSONL output records
+import os  # Directory walking and path handling
+import sys  # Progress output on stderr
+import time  # Per-document timings
+from concurrent.futures import ProcessPoolExecutor, as_completed  # Documents across processes
+
+import extract  # Format readers and the shared cleaning pipeline
+import extraction_cache  # Shared cache of extracted text keyed by file digest
+import core  # Document processing and LLM logic shared with the Streamlit app
+
+_llm_workers = core.MAX_WORKERS  # Concurrent model calls per worker process (set by _init_worker)
+
+# ================================
+# --- Worker Process ---
+# ================================
+def _init_worker(llm_workers):
+    global _llm_workers
+    _llm_workers = llm_workers
+    core.init_stores()
+
+
+def process_document(path, relative_path, digest, summary_type, questions, keep_ratio=None):
+    # Extract, summarize and question one file; runs inside a worker process
+    start = time.perf_counter()
+    ext = path.rsplit(".", 1)[-1].lower()
+    with open(path, "rb") as f:
+        buffer = io.BytesIO(f.read())
+
+    def read_text(file):
+        if ext == "pdf":
+            # Documents are already spread across processes: no nested page-range pool
+            return extract.extract_text_from_pdf(file, max_workers=1)
+        return extract.extract_text(file, ext)
+
+    text = extraction_cache.cached_extract(buffer, ext, read_text, extract.EXTRACTOR_VERSION)
+    record = {"path": relative_path, "digest": digest, "chars": len(text)}
+    if summary_type:
+        stats = {}
+        record["summary"] = core.summarize_file(text, summary_type, max_workers=_llm_workers,
+                                               keep_ratio=keep_ratio, stats=stats)
+        record["summary_stats"] = stats  # Includes map calls saved by stored and near-duplicate chunks
+    if questions:
+        index = core.BM25Index.from_text(text)  # Built once per document, shared by every question
+        document = core.document_digest(text)  # Repeat runs over the same text reuse cached answers
+        # Questions sharing passages are asked together, in concurrent batches
+        answers = core.answer_questions(text, questions, index, digest=document, max_workers=_llm_workers)
+        record["answers"] = dict(zip(questions, answers))
+    record["seconds"] = round(time.perf_counter() - start, 2)
+    return record
+
+# ================================
+# --- Checkpoints ---
+# ================================
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_checkpoint(out_path):
+    # (path, digest) pairs already written successfully; failed files are retried
+    done = set()
+    if os.path.exists(out_path):
+        with open(out_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash
+                if "error" not in record:
+                    done.add((record["path"], record["digest"]))
+    return done
+
+
+def iter_documents(directory):
+    # Yield (absolute path, path relative to the directory) for every supported file
+    supported = set(extract.supported_extensions())
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.rsplit(".", 1)[-1].lower() in supported:
+                path = os.path.join(root, filename)
+                yield path, os.path.relpath(path, directory)
+
+# ================================
+# --- Entry Point ---
+# ================================
+def main():
+    parser = argparse.ArgumentParser(description="Headless AstraDoc batch summarization and Q&A")
+    parser.add_argument("directory", help="Directory of PDF/DOCX/PPTX/TXT files")
+    parser.add_argument("--out", default="astradoc_results.jsonl", help="JSONL output; also the resume checkpoint")
+    parser.add_argument("--summary-type", choices=["Brief", "Detailed", "Key Points", "none"], default="Brief")
+    parser.add_argument("--condense", type=float, metavar="RATIO",
+                        help="Condense long documents locally to this fraction of their tokens before summarizing")
+    parser.add_argument("--questions", help="Text file with one question per line to ask of every document")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--llm-concurrency", type=int, default=core.MAX_WORKERS,
+                        help="Maximum concurrent requests to the model endpoint across all processes")
+    args = parser.parse_args()
+
+    questions = []
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    summary_type = None if args.summary_type == "none" else args.summary_type
+
+    # Split the endpoint concurrency budget across processes
+    processes = max(1, min(args.processes, args.llm_concurrency))
+    llm_workers = max(1, args.llm_concurrency // processes)
+
+    done = load_checkpoint(args.out)
+    pending = []
+    for path, relative_path in iter_documents(args.directory):
+        digest = file_digest(path)
+        if (relative_path, digest) not in done:
+            pending.append((path, relative_path, digest))
+    print(f"{len(pending)} documents to process, {len(done)} already done", file=sys.stderr)
+
+    core.init_stores()  # Create tables once before workers start
+    failures = 0
+    with open(args.out, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(llm_workers,)) as executor:
+        futures = {
+            executor.submit(process_document, path, relative_path, digest, summary_type, questions,
+                            args.condense): (relative_path, digest)
+            for path, relative_path, digest in pending
+        }
+        for count, future in enumerate(as_completed(futures), start=1):
+            relative_path, digest = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                failures += 1
+                record = {"path": relative_path, "digest": digest, "error": str(e)}
+            # Flushed per document, so a restart resumes after the last completed file
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            print(f"[{count}/{len(pending)}] {relative_path}" + (" FAILED" if "error" in record else ""),
+                  file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
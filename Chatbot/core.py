@@ -0,0 +1,517 @@
+# AstraDoc core: document processing and LLM logic shared by the Streamlit app,
+# the benchmarks and other headless entry points. Nothing here touches Streamlit.
+
+# 📦 Standard and Third-party Imports
+import json  # Structured answers of batched questions
+import os  # For interacting with the operating system (e.g., reading env vars)
+import threading  # Guards the shared retrieval index cache
+import time  # Per-call timings for instrumentation
+from collections import OrderedDict  # Least-recently-used retrieval index cache
+from concurrent.futures import CancelledError, ThreadPoolExecutor  # Bounded worker pool for concurrent LLM calls
+from dotenv import load_dotenv  # For loading environment variables from a .env file
+from openai import OpenAI  # NVIDIA-compatible OpenAI SDK for API calls
+from chunker import chunk_text, count_tokens  # Token-aware, sentence-aware document chunker
+from retrieval import BM25Index, PASSAGE_TOKENS, PASSAGE_OVERLAP, TOP_K  # Local lexical retrieval for document Q&A
+import document_store  # Shared, memory-mapped store of extracted text
+import summary_store  # Persistent, content-addressed store of chunk-level summaries
+import answer_cache  # Persistent cache of document answers keyed by normalized question
+import extraction_cache  # Cross-session cache of extracted text keyed by file digest
+import http_cache  # Conditional-GET cache for URL ingestion
+import corpus  # Multi-document corpus ingestion and persistent search index
+import metrics  # Per-call latency and token-usage records
+
+# 🌍 Load environment variables (like API keys)
+load_dotenv()
+api_key = os.getenv("NVIDIA_API_KEY")  # Fetch NVIDIA API key from the environment
+
+# 🤖 Initialize the OpenAI-compatible client (pointing to NVIDIA’s LLM endpoint)
+client = OpenAI(
+    base_url=os.getenv("NVIDIA_BASE_URL", "https://integrate.api.nvidia.com/v1"),  # NVIDIA-hosted OpenAI-compatible API
+    api_key=api_key
+)
+
+# 🔢 Configuration Constants
+MAX_TOKENS = 3000  # Token limit per chunk when processing documents
+OVERLAP = 125  # Overlap between chunks (in tokens) for better summarization continuity
+MAX_WORKERS = 8  # Maximum number of concurrent LLM requests per summary
+MODEL_NAME = "nvidia/llama-3.3-nemotron-super-49b-v1"  # Selected NVIDIA LLM model
+PROMPT_VERSION = "1"  # Bump when summary prompts change so stored summaries are not reused
+MAX_INDEXES = 16  # Retrieval indexes kept in memory, shared by all sessions on the same document
+BATCH_QUESTIONS = 8  # Most questions answered by one model call in batch Q&A
+BATCH_PASSAGES = 12  # Most passages sent with one batch of questions
+BATCH_ANSWER_TOKENS = 200  # Output tokens allowed per question in a batch
+
+# 🗄️ Create the summary store and cache tables if they don't exist
+def init_stores():
+    summary_store.init_store()
+    answer_cache.init_cache()
+    extraction_cache.init_cache()
+    http_cache.init_cache()
+    metrics.init_metrics()
+
+# --------------------------
+# 📚 Document Processing Logic
+# --------------------------
+
+# 🔌 Run one chat completion; with on_token set, stream it and report each text delta.
+# Every call is timed and its token usage recorded under `stage` (see metrics.py).
+def complete(messages, on_token=None, stage="other", **params):
+    started_at, start = time.time(), time.perf_counter()
+    ttft, usage, parts = None, None, []
+    try:
+        if on_token is None:
+            response = client.chat.completions.create(
+                model=MODEL_NAME, messages=messages, stream=False, **params
+            )
+            usage = response.usage
+            text = response.choices[0].message.content.strip()
+        else:
+            stream = client.chat.completions.create(
+                model=MODEL_NAME, messages=messages, stream=True,
+                stream_options={"include_usage": True},  # The final event carries the token usage
+                **params
+            )
+            for event in stream:
+                if getattr(event, "usage", None):
+                    usage = event.usage
+                if event.choices and event.choices[0].delta.content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start  # Time to first token
+                    delta = event.choices[0].delta.content
+                    parts.append(delta)
+                    on_token(delta)
+            text = "".join(parts).strip()
+    except Exception:
+        _record_call(stage, messages, started_at, start, ttft, None, "".join(parts), ok=False)
+        raise
+    _record_call(stage, messages, started_at, start, ttft, usage, text)
+    return text
+
+# 📈 Store one call's timings and token usage; estimated locally when the endpoint reports none
+def _record_call(stage, messages, started_at, start, ttft, usage, text, ok=True):
+    wall = time.perf_counter() - start
+    if usage is not None:
+        prompt_tokens, completion_tokens, estimated = usage.prompt_tokens, usage.completion_tokens, False
+    else:
+        prompt_tokens = sum(count_tokens(message["content"] or "") for message in messages)
+        completion_tokens, estimated = count_tokens(text), True
+    try:
+        metrics.record_call(stage, MODEL_NAME, started_at, wall, ttft, prompt_tokens, completion_tokens,
+                            estimated, ok)
+    except Exception:
+        pass  # Instrumentation must never fail a model call
+
+# 🔁 LSH buckets of a chunk signature; only summaries of the same style, model and prompt share them
+def signature_buckets(signature, summary_type):
+    import near_duplicates  # MinHash/LSH detection of near-identical chunks (loads NumPy)
+    scope = summary_store.make_key(summary_type, MODEL_NAME, PROMPT_VERSION)[:16]
+    return near_duplicates.band_keys(signature, scope)
+
+# 🔁 Find a stored summary of a near-identical chunk (only when reuse across documents is enabled)
+def find_similar_summary(signature, summary_type):
+    import near_duplicates
+    if not near_duplicates.ACROSS_DOCUMENTS:
+        return None
+    for key, stored in summary_store.get_candidates(signature_buckets(signature, summary_type)):
+        if near_duplicates.similarity(signature, near_duplicates.from_bytes(stored)) >= near_duplicates.SIMILARITY:
+            summary = summary_store.get_summary(key)
+            if summary is not None:
+                return summary
+    return None
+
+# ✏️ Summarize a single chunk of text using the NVIDIA LLM
+def summarize_chunk(content, summary_type, max_output_tokens, on_token=None, signature=None):
+    return _summarize_chunk(content, summary_type, max_output_tokens, on_token, signature)[0]
+
+# Returns (summary, source), where source is "model", "stored" or "near_duplicate"
+def _summarize_chunk(content, summary_type, max_output_tokens, on_token=None, signature=None):
+    key = summary_store.make_key("chunk", content, summary_type, MODEL_NAME, PROMPT_VERSION)
+    cached = summary_store.get_summary(key)
+    source = "stored"  # Unchanged chunk: reuse the stored summary without calling the model
+    if cached is None and signature is not None:
+        cached = find_similar_summary(signature, summary_type)  # A near-identical chunk seen before
+        source = "near_duplicate"
+    if cached is not None:
+        if on_token:
+            on_token(cached)
+        return cached, source
+
+    prompt = f"Provide a {summary_type} professional summary of this document. Use complete sentences, no bullet points:\n\n{content}"
+    summary = complete(
+        [
+            {"role": "system", "content": "You are an executive summary assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        on_token=on_token,
+        stage="summarize",
+        temperature=0.6,
+        top_p=0.95,
+        max_tokens=max_output_tokens
+    )
+    summary_store.put_summary(key, summary)
+    if signature is not None:
+        import near_duplicates
+        summary_store.put_signature(
+            key, signature_buckets(signature, summary_type), near_duplicates.to_bytes(signature)
+        )
+    return summary, "model"
+
+# 🧩 Merge several partial summaries into a single summary (reduce step)
+def merge_summaries(summaries, summary_type, max_output_tokens, on_token=None):
+    joined = "\n\n".join(summaries)
+    key = summary_store.make_key("merge", joined, summary_type, MODEL_NAME, PROMPT_VERSION)
+    cached = summary_store.get_summary(key)
+    if cached is not None:
+        if on_token:
+            on_token(cached)
+        return cached
+
+    prompt = f"Combine the following partial summaries of one document into a single {summary_type} professional summary. Remove repetition and keep the original order of ideas. Use complete sentences, no bullet points:\n\n{joined}"
+    summary = complete(
+        [
+            {"role": "system", "content": "You are an executive summary assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        on_token=on_token,
+        stage="merge",
+        temperature=0.6,
+        top_p=0.95,
+        max_tokens=max_output_tokens
+    )
+    summary_store.put_summary(key, summary)
+    return summary
+
+# 🗂️ Group partial summaries so each group fits within one reduce prompt
+def group_summaries(summaries, max_tokens=MAX_TOKENS):
+    groups, current, current_tokens = [], [], 0
+    for summary in summaries:
+        tokens = count_tokens(summary)
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    # Always merge at least two summaries per group so every level shrinks the list
+    if len(groups) == len(summaries) and len(summaries) > 1:
+        groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+    return groups
+
+# 📄 Summarize a full document: map chunks concurrently, then reduce hierarchically.
+# on_progress(stage, index, text) is called from worker threads with ("chunks", count, None)
+# once, then ("map", chunk_index, delta) and ("reduce", 0, delta) for the final merge.
+# full_text may be a string or a stored Document (read line by line, never copied whole).
+# With keep_ratio set, long documents are first condensed locally to their most
+# informative sentences, so fewer chunks reach the model. Near-identical chunks within the
+# document (and, when enabled, ones already summarized for another) reuse one partial summary;
+# pass a dict as `stats` to get the chunk, model-call and calls-saved counts. Setting the
+# `cancel` event stops the run before its next model call and raises CancelledError.
+def summarize_file(full_text, summary_type, max_workers=MAX_WORKERS, on_progress=None, keep_ratio=None,
+                   stats=None, cancel=None):
+    token_map = {"Brief": 500, "Detailed": 1024, "Key Points": 800}  # Output size mapping
+    max_output_tokens = token_map[summary_type]
+    if keep_ratio:
+        from extractive import condense
+        full_text = condense(full_text, keep_ratio)
+    chunks = list(chunk_text(full_text, MAX_TOKENS, OVERLAP))  # Split into chunks
+    if not chunks:
+        return ""
+    if on_progress:
+        on_progress("chunks", len(chunks), None)
+
+    # Group near-duplicate chunks; only the first chunk of each group is summarized.
+    # NumPy (for MinHash and condensing) is only loaded once a summary is requested.
+    import near_duplicates
+    signatures = [near_duplicates.signature(chunk) for chunk in chunks]
+    representatives = near_duplicates.find_duplicates(signatures)
+    unique = [index for index, representative in enumerate(representatives) if representative == index]
+
+    def check_cancelled():
+        if cancel is not None and cancel.is_set():
+            raise CancelledError()
+
+    def map_chunk(index):
+        check_cancelled()
+        on_token = (lambda delta: on_progress("map", index, delta)) if on_progress else None
+        return _summarize_chunk(chunks[index], summary_type, max_output_tokens, on_token, signatures[index])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Map: executor.map keeps results in chunk order regardless of completion order
+        results = dict(zip(unique, executor.map(metrics.bind_context(map_chunk), unique)))
+        if on_progress:
+            for index, representative in enumerate(representatives):
+                if representative != index:
+                    on_progress("map", index, results[representative][0])
+        if stats is not None:
+            sources = [source for _, source in results.values()]
+            stats.update({
+                "chunks": len(chunks),
+                "model_calls": sources.count("model"),
+                "stored": sources.count("stored"),
+                "within_document": len(chunks) - len(unique),
+                "across_documents": sources.count("near_duplicate"),
+                "calls_saved": len(chunks) - sources.count("model"),
+            })
+        # Repeated chunks are merged once, so boilerplate does not crowd the reduce prompts
+        summaries = [results[index][0] for index in unique]
+
+        # Reduce: merge groups level by level until a single summary remains
+        while len(summaries) > 1:
+            check_cancelled()
+            groups = group_summaries(summaries)
+            # Only the last merge produces the final summary, so only it is streamed
+            on_token = None
+            if on_progress and len(groups) == 1:
+                on_token = lambda delta: on_progress("reduce", 0, delta)
+            summaries = list(executor.map(metrics.bind_context(
+                lambda group: merge_summaries(group, summary_type, max_output_tokens, on_token)
+            ), groups))
+
+    return summaries[0]
+
+# 🔑 Content digest of a document's text, used to share cached answers across sessions
+def document_digest(text):
+    return document_store.text_digest(text)
+
+# 🔎 Retrieval index of a stored document, built once per process and shared by every session.
+# Its passages are read from the document store's memory-mapped passages file.
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def document_index(document):
+    if getattr(document, "index", None) is not None:
+        return document.index  # A document still being ingested carries its own growing index
+    with _indexes_lock:
+        if document.digest in _indexes:
+            _indexes.move_to_end(document.digest)
+            return _indexes[document.digest]
+    index = BM25Index(document.passages(PASSAGE_TOKENS, PASSAGE_OVERLAP))
+    with _indexes_lock:
+        _indexes[document.digest] = index
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+# ❓ Find an answer to a user question from the most relevant passages of the document
+def find_answer_in_text(text, question, index=None, on_token=None, digest=None):
+    # With the document's digest, repeated questions are answered from the answer cache
+    document = summary_store.make_key("qa", digest, MODEL_NAME, PROMPT_VERSION) if digest else None
+    if document:
+        cached = answer_cache.get_answer(document, question)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return cached
+
+    if index is None:
+        index = BM25Index.from_text(text)  # Build on demand when no stored index is given
+    context = "\n...\n".join(index.top_passages(question))  # Only top-k passages reach the model
+    prompt = f"""Answer this question based ONLY on the provided text. Be precise and professional:
+
+Text:
+\"\"\"{context}\"\"\"
+
+Question: {question}
+
+Respond with ONLY the factual answer."""
+    answer = complete(
+        [
+            {"role": "system", "content": "You are a factual Q&A system."},
+            {"role": "user", "content": prompt}
+        ],
+        on_token=on_token,
+        stage="qa",
+        temperature=0.3,
+        max_tokens=512
+    )
+    answer = answer if answer.lower() != "i don't know" else "Answer not found in document."
+    if document:
+        answer_cache.put_answer(document, question, answer)
+    return answer
+
+# 🗂️ Group questions by their retrieved passage ids: each joins the group it shares the most passages
+# with, while groups stay within max_questions and max_passages. Returns lists of question indexes.
+def group_questions(passage_ids, max_questions=BATCH_QUESTIONS, max_passages=BATCH_PASSAGES):
+    groups = []  # [question indexes, set of passage ids]
+    for question, ids in enumerate(passage_ids):
+        ids = set(ids)
+        best, best_shared = None, -1
+        for group in groups:
+            shared = len(ids & group[1])
+            if shared > best_shared and len(group[0]) < max_questions and len(ids | group[1]) <= max_passages:
+                best, best_shared = group, shared
+        if best is None:
+            groups.append([[question], ids])
+        else:
+            best[0].append(question)
+            best[1] |= ids
+    return [group[0] for group in groups]
+
+# {"1": "...", "2": "..."} -> answers by position; missing or unparsable entries are None
+def _parse_batch_answers(reply, count):
+    start, end = reply.find("{"), reply.rfind("}")
+    try:
+        answers = json.loads(reply[start:end + 1]) if start != -1 else {}
+    except json.JSONDecodeError:
+        answers = {}
+    if not isinstance(answers, dict):
+        answers = {}
+    parsed = []
+    for number in range(1, count + 1):
+        answer = answers.get(str(number))
+        parsed.append(str(answer).strip() if answer not in (None, "") else None)
+    return parsed
+
+# 📦 Answer several questions in one model call over the union of their passages
+def _answer_batch(passages, questions):
+    context = "\n...\n".join(passages)
+    numbered = "\n".join(f"{number}. {question}" for number, question in enumerate(questions, start=1))
+    prompt = f"""Answer each question based ONLY on the provided text. Be precise and professional:
+
+Text:
+\"\"\"{context}\"\"\"
+
+Questions:
+{numbered}
+
+Respond with ONLY a JSON object mapping each question number to its factual answer, e.g. {{"1": "..."}}.
+Use "I don't know" for questions the text does not answer."""
+    reply = complete(
+        [
+            {"role": "system", "content": "You are a factual Q&A system."},
+            {"role": "user", "content": prompt}
+        ],
+        stage="batch_qa",
+        temperature=0.3,
+        max_tokens=BATCH_ANSWER_TOKENS * len(questions)
+    )
+    return _parse_batch_answers(reply, len(questions))
+
+# 📋 Answer a checklist of questions with one retrieval pass and as few model calls as possible
+# Questions that share passages are asked together; batches run concurrently, at most
+# max_workers at a time. on_answer(position, answer) reports each answer as it arrives.
+# Returns the answers in question order, plus stats with the cached/model-call counts.
+def answer_questions(text, questions, index=None, digest=None, max_workers=MAX_WORKERS, on_answer=None,
+                     stats=None):
+    answers = [None] * len(questions)
+    document = summary_store.make_key("qa", digest, MODEL_NAME, PROMPT_VERSION) if digest else None
+
+    def resolve(position, answer, store=True):
+        answer = answer if answer.lower() != "i don't know" else "Answer not found in document."
+        answers[position] = answer
+        if document and store:
+            answer_cache.put_answer(document, questions[position], answer)
+        if on_answer:
+            on_answer(position, answer)
+
+    pending = []
+    for position, question in enumerate(questions):
+        cached = answer_cache.get_answer(document, question) if document else None
+        if cached is not None:
+            resolve(position, cached, store=False)
+        else:
+            pending.append(position)
+
+    if index is None and pending:
+        index = BM25Index.from_text(text)  # Build on demand when no stored index is given
+    passage_ids = []
+    for position in pending:
+        # Same passages find_answer_in_text would send, falling back to the opening ones
+        ids = index.search(questions[position]) or list(range(min(TOP_K, len(index.passages))))
+        passage_ids.append(ids)
+    batches = [[pending[member] for member in group] for group in group_questions(passage_ids)]
+    ids_by_position = dict(zip(pending, passage_ids))
+    retried = []  # Questions the batch reply left unanswered, asked again on their own
+
+    def run_batch(batch):
+        ids = sorted(set().union(*(ids_by_position[position] for position in batch)))
+        batch_answers = _answer_batch([index.passages[i] for i in ids], [questions[p] for p in batch])
+        for position, answer in zip(batch, batch_answers):
+            if answer is None:
+                # Not answered in the batch reply: ask it on its own
+                retried.append(position)
+                answer = find_answer_in_text(text, questions[position], index, digest=digest)
+                if on_answer:
+                    on_answer(position, answer)
+                answers[position] = answer
+            else:
+                resolve(position, answer)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(metrics.bind_context(run_batch), batches))
+
+    if stats is not None:
+        stats.update({
+            "questions": len(questions),
+            "cached": len(questions) - len(pending),
+            "model_calls": len(batches) + len(retried),
+        })
+    return answers
+
+# 📚 Answer a question across a whole corpus, citing the source files used
+def answer_corpus_question(index_path, question, on_token=None):
+    hits = corpus.search_corpus(index_path, question)
+    if not hits:
+        return "Answer not found in corpus.", []
+    context = "\n\n".join(f"[Source: {path}]\n{passage}" for path, passage in hits)
+    prompt = f"""Answer this question based ONLY on the provided excerpts. Be precise and professional.
+Cite the source file of every fact in square brackets, e.g. [contract_a.pdf]:
+
+Excerpts:
+\"\"\"{context}\"\"\"
+
+Question: {question}
+
+Respond with ONLY the factual answer and its citations."""
+    answer = complete(
+        [
+            {"role": "system", "content": "You are a factual Q&A system."},
+            {"role": "user", "content": prompt}
+        ],
+        on_token=on_token,
+        stage="corpus_qa",
+        temperature=0.3,
+        max_tokens=512
+    )
+    sources = list(dict.fromkeys(path for path, _ in hits))  # Unique, in ranking order
+    if answer.lower() == "i don't know":
+        return "Answer not found in corpus.", sources
+    return answer, sources
+
+# --------------------------
+# 💬 AI Chat Interaction
+# --------------------------
+
+# 🧠 Fold older chat turns into the rolling summary (runs in the background)
+def summarize_conversation(previous_summary, messages):
+    transcript = "\n".join(f"{msg['role'].title()}: {msg['content']}" for msg in messages)
+    prompt = f"""Update the summary of a conversation with the new turns below. Keep facts, decisions, names and open questions; drop small talk. Reply with the updated summary only.
+
+Current summary:
+{previous_summary or "(none)"}
+
+New turns:
+{transcript}"""
+    return complete(
+        [
+            {"role": "system", "content": "You summarize conversations concisely."},
+            {"role": "user", "content": prompt}
+        ],
+        stage="memory",
+        temperature=0.3,
+        max_tokens=400
+    )
+
+# Send one chat turn: appends the user message and the reply to `history`
+def chat_with_ai(history, memory, user_message, on_token=None):
+    history.append({"role": "user", "content": user_message})
+
+    # Recent turns verbatim plus a rolling summary of older ones, within a fixed token budget
+    messages = [
+        {"role": "system", "content": "You are a professional AI assistant. Provide concise, helpful responses."}
+    ] + memory.build_messages(history)
+
+    ai_response = complete(messages, on_token=on_token, stage="chat", temperature=0.7, max_tokens=1024)
+    history.append({"role": "assistant", "content": ai_response})
+    return ai_response
@@ -0,0 +1,183 @@
+# Import required modules and libraries
+import hashlib  # Per-file digests for incremental re-ingestion
+import io  # In-memory buffers handed to the extractors
+import os  # Directory walking and path handling
+import time  # Ingestion timestamps
+import zipfile  # Corpora delivered as a .zip archive
+from collections import deque  # Bounded window of files being extracted
+from concurrent.futures import ProcessPoolExecutor  # Extract many files on every core
+
+import extract  # Format readers and the shared cleaning pipeline
+import sqlite_cache  # Shared connection helper for the FTS5 passage index
+from chunker import chunk_text  # Passages are built from the shared chunker
+from retrieval import PASSAGE_TOKENS, PASSAGE_OVERLAP, TOP_K, tokenize  # Same passages and terms as single-document Q&A
+
+INDEX_DIR = os.getenv("ASTRADOC_CORPUS_INDEX_DIR", "astradoc_corpus_indexes")  # App-owned index files
+
+# ================================
+# --- Index Storage ---
+# ================================
+def resolve_source(path, root=None):
+    """
+    Resolve a corpus folder or zip path (absolute, or relative to root) and
+    check that it exists inside root, by default ASTRADOC_CORPUS_ROOT. Raises
+    ValueError otherwise, so user input can never reach arbitrary server paths.
+    """
+    root = root or os.getenv("ASTRADOC_CORPUS_ROOT")  # Read per call, so a .env loaded later applies
+    if not root:
+        raise ValueError("Corpus ingestion is disabled: set ASTRADOC_CORPUS_ROOT")
+    root = os.path.realpath(root)
+    source = os.path.realpath(os.path.join(root, path))  # An absolute path replaces root here
+    if os.path.commonpath([root, source]) != root:
+        raise ValueError("Corpus path is outside the corpus root")
+    if not os.path.exists(source):
+        raise ValueError("Corpus path not found")
+    return source
+
+
+def default_index_path(source):
+    # Indexes live in the app's own directory, one per source, never inside the corpus itself
+    digest = hashlib.sha256(os.path.realpath(source).encode("utf-8")).hexdigest()[:32]
+    return os.path.join(INDEX_DIR, f"{digest}.db")
+
+
+def _connect(index_path):
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    conn = sqlite_cache.connect(index_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,  -- File path relative to the corpus root (or zip member name)
+            digest TEXT,            -- SHA-256 of the file bytes when it was ingested
+            passages INTEGER,       -- Number of passages indexed for the file
+            ingested_at REAL        -- Unix time of the last ingestion
+        )
+    """)
+    # Full-text index over passages; path and position are stored but not tokenized
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(text, path UNINDEXED, position UNINDEXED)")
+    return conn
+
+# ================================
+# --- Corpus Sources ---
+# ================================
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def iter_corpus_files(source):
+    # Yield (relative path, extension, bytes loader) for every supported file in a folder or zip
+    supported = set(extract.supported_extensions())
+    if zipfile.is_zipfile(source):
+        archive = zipfile.ZipFile(source)
+        for info in archive.infolist():
+            ext = info.filename.rsplit(".", 1)[-1].lower()
+            if not info.is_dir() and ext in supported:
+                yield info.filename, ext, lambda name=info.filename: archive.read(name)
+        return
+
+    for root, _, files in os.walk(source):
+        for filename in sorted(files):
+            ext = filename.rsplit(".", 1)[-1].lower()
+            if ext in supported:
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, source), ext, lambda path=path: _read_file(path)
+
+
+def _extract_passages(data, ext):
+    # Runs in worker processes: extract one file and split it into passages
+    buffer = io.BytesIO(data)
+    if ext == "pdf":
+        lines = extract.clean_lines(extract.read_pdf_lines(buffer, max_workers=1))  # Files are already parallel
+    else:
+        lines = extract.iter_text_lines(buffer, ext)
+    return list(chunk_text(lines, PASSAGE_TOKENS, PASSAGE_OVERLAP))
+
+# ================================
+# --- Ingestion ---
+# ================================
+def ingest_corpus(source, index_path=None, max_workers=None):
+    """
+    Ingest every PDF/DOCX/PPTX/TXT file of a directory or zip into the
+    persistent index. Files whose digest is unchanged since the last run are
+    skipped, changed files are re-indexed and deleted files are dropped.
+    Returns a dict of counts: added, updated, unchanged, removed, failed.
+    """
+    index_path = index_path or default_index_path(source)
+    conn = _connect(index_path)
+    known = dict(conn.execute("SELECT path, digest FROM files").fetchall())
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0}
+
+    def store(path, digest, future):
+        # Replace a file's passages with the freshly extracted ones
+        try:
+            passages = future.result()
+        except Exception:
+            stats["failed"] += 1
+            return
+        conn.execute("DELETE FROM passages WHERE path = ?", (path,))
+        conn.executemany(
+            "INSERT INTO passages (text, path, position) VALUES (?, ?, ?)",
+            [(passage, path, position) for position, passage in enumerate(passages)]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO files (path, digest, passages, ingested_at) VALUES (?, ?, ?, ?)",
+            (path, digest, len(passages), time.time())
+        )
+        conn.commit()
+        stats["updated" if path in known else "added"] += 1
+
+    # Extract new or changed files concurrently. Only a bounded window of files is in
+    # flight at once, so the bytes of a large corpus are never all held in memory.
+    workers = max_workers or os.cpu_count() or 1
+    seen, in_flight = set(), deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=extract.process_context()) as executor:
+        window = workers * 2
+        for path, ext, load in iter_corpus_files(source):
+            seen.add(path)
+            data = load()
+            digest = hashlib.sha256(data).hexdigest()
+            if known.get(path) == digest:
+                stats["unchanged"] += 1
+                continue
+            in_flight.append((path, digest, executor.submit(_extract_passages, data, ext)))
+            if len(in_flight) >= window:
+                store(*in_flight.popleft())
+        while in_flight:
+            store(*in_flight.popleft())
+
+    # Drop files that no longer exist in the source
+    for path in set(known) - seen:
+        conn.execute("DELETE FROM passages WHERE path = ?", (path,))
+        conn.execute("DELETE FROM files WHERE path = ?", (path,))
+        stats["removed"] += 1
+    conn.commit()
+    conn.close()
+    return stats
+
+# ================================
+# --- Search ---
+# ================================
+def corpus_files(index_path):
+    # List (path, passages) for every indexed file
+    conn = _connect(index_path)
+    rows = conn.execute("SELECT path, passages FROM files ORDER BY path").fetchall()
+    conn.close()
+    return rows
+
+
+def search_corpus(index_path, question, top_k=TOP_K):
+    """
+    Return the top_k (path, passage) pairs for a question, ranked by the
+    index's BM25 score.
+    """
+    terms = tokenize(question)
+    if not terms:
+        return []
+    query = " OR ".join('"' + term.replace('"', '""') + '"' for term in set(terms))
+    conn = _connect(index_path)
+    rows = conn.execute(
+        "SELECT path, text FROM passages WHERE passages MATCH ? ORDER BY bm25(passages) LIMIT ?",
+        (query, top_k)
+    ).fetchall()
+    conn.close()
+    return rows
@@ -0,0 +1,180 @@
+# Shared, disk-backed store of extracted document text. Every distinct text is written once
+# per content digest and memory-mapped, so all sessions on the same document share one copy
+# in the OS page cache; sessions only keep a small Document handle.
+import hashlib  # Content digests
+import mmap  # Zero-copy views of stored text
+import os  # File paths, atomic renames and configuration
+import threading  # Guards the process-wide map of open files
+import weakref  # Maps are released when their last handle is garbage collected
+from array import array  # Compact passage offset tables
+from collections.abc import Sequence  # Passages behave like a read-only list
+
+from chunker import chunk_text  # Passages are built from the shared chunker
+
+STORE_DIR = os.getenv("ASTRADOC_DOCUMENT_DIR", "astradoc_documents")  # Directory holding the text files
+MAX_BYTES = int(os.getenv("ASTRADOC_DOCUMENT_DIR_MAX_BYTES", 1024 * 1024 * 1024))  # Disk cap before eviction
+
+_maps = {}  # path -> mmap, shared by every session in the process
+_handles = {}  # path -> number of live Document/Passages handles; these files are never evicted
+_maps_lock = threading.Lock()
+
+
+def text_digest(text):
+    # SHA-256 of the UTF-8 text: the document's identity across sessions and runs
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _path(name):
+    return os.path.join(STORE_DIR, name)
+
+
+def _write_once(name, data):
+    # Write atomically, so concurrent sessions never map a half-written file
+    path = _path(name)
+    if not os.path.exists(path):
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    else:
+        os.utime(path)  # Mark as recently used for eviction
+    return path
+
+
+def _acquire(handle, path):
+    # Count a live handle on path; when the last one is collected its map is closed
+    with _maps_lock:
+        _handles[path] = _handles.get(path, 0) + 1
+    weakref.finalize(handle, _release, path)
+
+
+def _release(path):
+    with _maps_lock:
+        _handles[path] -= 1
+        if _handles[path]:
+            return
+        del _handles[path]
+        data = _maps.pop(path, None)
+    if isinstance(data, mmap.mmap):
+        data.close()
+
+
+def _open_map(path):
+    # Map each file once per process; empty files cannot be mapped and read as b""
+    with _maps_lock:
+        if path not in _maps:
+            with open(path, "rb") as f:
+                _maps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        return _maps[path]
+
+
+def _evict(max_bytes=MAX_BYTES):
+    # Remove least recently used files until under the cap. A passages text file and its
+    # offsets are removed together; files with live handles in this process are kept.
+    groups = {}
+    for entry in os.scandir(STORE_DIR):
+        if entry.is_file() and not entry.name.endswith(".tmp"):
+            stem = entry.name.rsplit(".", 1)[0]  # "<digest>" or "<digest>.p<tokens>-<overlap>"
+            groups.setdefault(stem, []).append((entry.path, entry.stat()))
+    total = sum(stat.st_size for files in groups.values() for _, stat in files)
+    with _maps_lock:
+        for files in sorted(groups.values(), key=lambda files: max(stat.st_mtime for _, stat in files)):
+            if total <= max_bytes:
+                break
+            if any(path in _handles for path, _ in files):
+                continue
+            for path, stat in files:
+                total -= stat.st_size
+                os.remove(path)
+
+# ================================
+# --- Documents ---
+# ================================
+class Document:
+    """
+    Handle on a stored document. Iterating yields its lines (so it can be
+    passed to chunk_text directly), read() decodes a byte range, and
+    str(document) materializes the whole text when a caller needs it.
+    """
+
+    def __init__(self, digest):
+        self.digest = digest
+        self.path = _path(f"{digest}.txt")
+        _acquire(self, self.path)
+
+    @property
+    def _data(self):
+        return _open_map(self.path)
+
+    def __len__(self):
+        return len(self._data)  # Size in bytes
+
+    def __bool__(self):
+        return True  # A handle is truthy even for an empty document
+
+    def read(self, start=0, end=None):
+        return self._data[start:end].decode("utf-8")
+
+    def __str__(self):
+        return self.read()
+
+    def __iter__(self):
+        # Lines are decoded one at a time; the text is never copied whole
+        data, position, size = self._data, 0, len(self._data)
+        while position < size:
+            end = data.find(b"\n", position)
+            end = size if end == -1 else end + 1
+            yield data[position:end].decode("utf-8")
+            position = end
+
+    def passages(self, passage_tokens, overlap):
+        """
+        The document's retrieval passages as a read-only sequence backed by a
+        stored passages file, built on first use and shared by all sessions.
+        """
+        name = f"{self.digest}.p{passage_tokens}-{overlap}"
+        if os.path.exists(_path(f"{name}.txt")) and os.path.exists(_path(f"{name}.offsets")):
+            for path in (_path(f"{name}.txt"), _path(f"{name}.offsets")):
+                os.utime(path)  # Mark both files as recently used for eviction
+        else:
+            data, offsets = bytearray(), array("Q", [0])
+            for passage in chunk_text(self, passage_tokens, overlap):
+                data += passage.encode("utf-8")
+                offsets.append(len(data))
+            _write_once(f"{name}.txt", bytes(data))
+            _write_once(f"{name}.offsets", offsets.tobytes())
+        return Passages(_path(f"{name}.txt"), _path(f"{name}.offsets"))
+
+
+class Passages(Sequence):
+    # Passage i is bytes offsets[i]:offsets[i + 1] of a memory-mapped file, decoded on access
+    def __init__(self, path, offsets_path):
+        self.path = path
+        _acquire(self, path)
+        self.offsets = array("Q")
+        with open(offsets_path, "rb") as f:
+            self.offsets.frombytes(f.read())
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return _open_map(self.path)[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+
+def put_text(text):
+    """
+    Store text (once per digest) and return its Document handle.
+    """
+    os.makedirs(STORE_DIR, exist_ok=True)
+    digest = text_digest(text)
+    document = Document(digest)  # A live handle, so eviction below never removes this file
+    _write_once(f"{digest}.txt", text.encode("utf-8"))
+    _evict()
+    return document
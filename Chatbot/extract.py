@@ -1,220 +1,438 @@
 # Import required modules and libraries
 import re  # Regular expressions module
-from langchain_community.document_loaders import PyPDFLoader  # For loading PDF files via LangChain
-from docx import Document  # To work with .docx files (Word documents)
-from pptx import Presentation  # To work with .pptx files (PowerPoint presentations)
-from PIL import Image  # Python Imaging Library for image processing
-import requests  # To make HTTP requests
-from bs4 import BeautifulSoup  # For parsing HTML/XML content
-from readability import Document as ReadabilityDocument  # Extracts main content from web articles
+import threading  # Guards the shared HTTP session and the OCR rate limiter
+import time  # OCR request pacing and latency measurement
+from collections import deque  # Page ranges in flight, in page order
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor  # PDF page ranges and URL batches
 import io  # For handling byte streams
 import os  # For interacting with the operating system
-from dotenv import load_dotenv  # Loads environment variables from a .env file
+import http_cache  # On-disk cache of fetched articles with their ETag/Last-Modified validators
+
+# Format backends (pypdf, python-docx, python-pptx, PIL, requests, bs4, readability)
+# are imported inside the readers that use them, on the first use of each format.
+# Importing them here added several hundred milliseconds to every cold start, even
+# for sessions that never open a document; `python benchmark.py importtime` checks
+# the budget.
+
+# Bump whenever extraction or cleaning output changes so cached extractions are invalidated
+EXTRACTOR_VERSION = "2"
 
 # ================================
-# --- PDF Text Extraction ---
+# --- Shared Cleaning Pipeline ---
 # ================================
-def extract_text_from_pdf(uploaded_file):
-    # Save uploaded file locally as PDF
-    with open("temp_uploaded_file.pdf", "wb") as f:
-        f.write(uploaded_file.getbuffer())
 
-    # Load the saved PDF using LangChain's PDF loader
-    pdf_loader = PyPDFLoader("temp_uploaded_file.pdf")
-    docs = pdf_loader.load()  # Load pages as documents
+# Patterns of text lines to exclude (e.g., InDesign file tags). Blank and
+# whitespace-only lines are always dropped.
+UNWANTED_PATTERNS = [
+    r'.*indd.*',  # Matches lines that contain 'indd'
+]
+
+# All patterns compiled once into a single alternation
+_UNWANTED = re.compile("|".join(f"(?:{pattern})" for pattern in UNWANTED_PATTERNS))
+
+
+def clean_lines(lines):
+    # Strip every raw line and drop blank or unwanted ones; streams, so memory stays bounded
+    match = _UNWANTED.match
+    for line in lines:
+        stripped_line = line.strip()
+        if stripped_line and not match(stripped_line):
+            yield stripped_line
+
+
+def join_lines(lines):
+    # Build the output text in one pass instead of repeated string concatenation
+    return "".join(f"{line}\n" for line in lines)
+
+# ================================
+# --- Extractor Registry ---
+# ================================
+
+# File extension -> function yielding the raw text lines of an uploaded file
+LINE_READERS = {}
+
+
+def register_extractor(*extensions):
+    # Decorator that plugs a raw-line reader into the registry for the given extensions
+    def decorator(reader):
+        for extension in extensions:
+            LINE_READERS[extension] = reader
+        return reader
+    return decorator
 
-    # Patterns of text lines to exclude (e.g., file tags or empty lines)
-    unwanted_patterns = [
-        r'.*indd.*',  # Matches lines that contain 'indd'
-        r'^\s+$'      # Matches lines that are only whitespace
-    ]
 
-    full_text = ""  # String to accumulate cleaned text
+def supported_extensions():
+    # Extensions accepted by extract_text, in registration order
+    return list(LINE_READERS)
 
-    # Iterate over each page in the document
-    for page_number, doc in enumerate(docs, start=1):
-        page_content = doc.page_content  # Get text content of the page
-        filtered_content = []  # List to hold cleaned lines for current page
 
-        # Filter out unwanted lines
-        for line in page_content.split('\n'):
-            if any(re.match(pattern, line.strip()) for pattern in unwanted_patterns):
-                continue
-            filtered_content.append(line.strip())
+def iter_text_lines(uploaded_file, file_ext):
+    # Stream the cleaned lines of an uploaded file (e.g. straight into chunk_text)
+    reader = LINE_READERS.get(file_ext.lower())
+    if reader is None:
+        raise ValueError(f"Unsupported file format: {file_ext}")
+    return clean_lines(reader(uploaded_file))
 
-        # Add cleaned lines to full text
-        for line in filtered_content:
-            if line.strip():  # Skip blank lines
-                full_text += line + "\n"
 
-    return full_text  # Return cleaned and aggregated PDF text
+def extract_text(uploaded_file, file_ext):
+    # Extract and clean the text of an uploaded file with the reader registered for its format
+    return join_lines(iter_text_lines(uploaded_file, file_ext))
 
 # ================================
-# --- TXT File Text Extraction ---
+# --- PDF Text Extraction ---
 # ================================
-def extract_text_from_txt(uploaded_file):
-    # Read all lines from the text file and decode from bytes to string
-    lines = uploaded_file.read().decode("utf-8").splitlines()
+PDF_PAGES_PER_TASK = 25  # Pages per progress update (and in the first pool task)
+PDF_PARALLEL_MIN_PAGES = 50  # Smaller PDFs are parsed in-process; a pool would cost more than it saves
+PDF_POOL_WORKERS = os.cpu_count() or 1  # Size of the process-wide PDF pool, shared by every session
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def process_context():
+    # Start method for worker pools. The app forks from a multi-threaded server (and from
+    # background threads), and a forked child can inherit a lock held by another thread and
+    # deadlock; forkserver (or spawn where unavailable) starts workers from a clean process.
+    import multiprocessing
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_pdf_pool():
+    # One long-lived pool per process, started on first use; starting a pool per PDF cost
+    # a fork (or interpreter start) per worker on every upload
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_POOL_WORKERS, mp_context=process_context())
+        return _pdf_pool
+
+
+def _extract_pdf_page_range(pdf_bytes, start, end):
+    # Parse pages [start, end) of an in-memory PDF and return their text.
+    # Runs inside worker processes, so each call opens its own reader on the bytes;
+    # opening one flattens the whole page tree, so each task covers a large share of the file.
+    from pypdf import PdfReader  # Reads PDFs directly from in-memory buffers
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    return [reader.pages[number].extract_text() or "" for number in range(start, end)]
+
+
+def iter_pdf_page_ranges(pdf_bytes, max_workers=None):
+    """
+    Yield (pages_done, page_count, page texts) for consecutive page ranges, in
+    page order. Small PDFs (or max_workers=1) are read in-process with a single
+    reader, a range every PDF_PAGES_PER_TASK pages. Large PDFs are parsed by
+    the shared process pool: a short first range, then about one range per
+    worker, so the file is opened and sent to a worker once per range rather
+    than once per PDF_PAGES_PER_TASK pages. Closing the generator early cancels the ranges
+    not yet started.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    page_count = len(reader.pages)
+    workers = min(max_workers or os.cpu_count() or 1, -(-page_count // PDF_PAGES_PER_TASK))
+
+    if page_count < PDF_PARALLEL_MIN_PAGES or workers <= 1:
+        pages = []
+        for number, page in enumerate(reader.pages, start=1):
+            pages.append(page.extract_text() or "")
+            if len(pages) == PDF_PAGES_PER_TASK or number == page_count:
+                yield number, page_count, pages
+                pages = []
+        return
+
+    # A short first range, so progressive readers get the opening pages quickly, then
+    # the rest split into one range per worker
+    size = max(-(-(page_count - PDF_PAGES_PER_TASK) // workers), PDF_PAGES_PER_TASK)
+    ranges = [(0, PDF_PAGES_PER_TASK)] + [(start, min(start + size, page_count))
+                                          for start in range(PDF_PAGES_PER_TASK, page_count, size)]
+
+    # Yield ranges in page order, so output is deterministic
+    pool = _get_pdf_pool()
+    in_flight = deque((end, pool.submit(_extract_pdf_page_range, pdf_bytes, start, end)) for start, end in ranges)
+    try:
+        while in_flight:
+            end, future = in_flight.popleft()
+            yield end, page_count, future.result()
+    finally:
+        for _, future in in_flight:
+            future.cancel()  # Ranges already running finish in the background and are discarded
 
-    # Patterns to ignore
-    unwanted_patterns = [
-        r'.*indd.*',
-        r'^\s+$'
-    ]
 
-    full_text = ""  # Accumulate cleaned lines here
-    for line in lines:
-        stripped_line = line.strip()  # Remove leading/trailing whitespace
-        if any(re.match(pattern, stripped_line) for pattern in unwanted_patterns):
-            continue
-        if stripped_line:  # Skip empty lines
-            full_text += stripped_line + "\n"
+@register_extractor("pdf")
+def read_pdf_lines(uploaded_file, max_workers=None):
+    # Read the upload straight from memory; no temp file is shared between sessions
+    for _, _, pages in iter_pdf_page_ranges(uploaded_file.getvalue(), max_workers):
+        for page_content in pages:
+            yield from page_content.split('\n')
+
 
-    return full_text  # Return cleaned text
+def extract_text_from_pdf(uploaded_file, max_workers=None):
+    return join_lines(clean_lines(read_pdf_lines(uploaded_file, max_workers)))  # Cleaned and aggregated PDF text
 
 # ================================
-# --- DOCX File Text Extraction ---
+# --- TXT File Text Extraction ---
 # ================================
-def extract_text_from_docx(uploaded_file):
-    doc = Document(uploaded_file)  # Load Word document from uploaded file
+@register_extractor("txt")
+def read_txt_lines(uploaded_file):
+    # Decode the text file line by line instead of materializing a list of lines
+    return io.TextIOWrapper(io.BytesIO(uploaded_file.getvalue()), encoding="utf-8")
 
-    unwanted_patterns = [
-        r'.*indd.*',
-        r'^\s+$'
-    ]
 
-    full_text = ""
+def extract_text_from_txt(uploaded_file):
+    return extract_text(uploaded_file, "txt")
+
+# ================================
+# --- DOCX File Text Extraction ---
+# ================================
+@register_extractor("docx")
+def read_docx_lines(uploaded_file):
+    from docx import Document  # To work with .docx files (Word documents)
+    doc = Document(uploaded_file)  # Load Word document from uploaded file
     for para in doc.paragraphs:  # Iterate over paragraphs
-        line = para.text.strip()  # Get paragraph text and trim it
-        if any(re.match(pattern, line) for pattern in unwanted_patterns):
-            continue
-        if line:  # If not empty, add to result
-            full_text += line + "\n"
+        yield para.text
+
 
-    return full_text
+def extract_text_from_docx(uploaded_file):
+    return extract_text(uploaded_file, "docx")
 
 # ================================
 # --- PPTX File Text Extraction ---
 # ================================
-def extract_text_from_pptx(uploaded_file):
+@register_extractor("pptx")
+def read_pptx_lines(uploaded_file):
+    from pptx import Presentation  # To work with .pptx files (PowerPoint presentations)
     prs = Presentation(uploaded_file)  # Load PowerPoint presentation
-
-    unwanted_patterns = [
-        r'.*indd.*',
-        r'^\s+$'
-    ]
-
-    full_text = ""
-    for slide_number, slide in enumerate(prs.slides, start=1):  # Iterate over slides
+    for slide in prs.slides:  # Iterate over slides
         for shape in slide.shapes:
             if hasattr(shape, "text"):  # Only consider shapes that have text
-                for line in shape.text.split('\n'):  # Split text into lines
-                    stripped_line = line.strip()
-                    if any(re.match(pattern, stripped_line) for pattern in unwanted_patterns):
-                        continue
-                    if stripped_line:
-                        full_text += stripped_line + "\n"
+                yield from shape.text.split('\n')
 
-    return full_text
+
+def extract_text_from_pptx(uploaded_file):
+    return extract_text(uploaded_file, "pptx")
 
 # ================================
 # --- Image Text Extraction using OCR.Space API ---
 # ================================
-def extract_text_from_image(uploaded_file):
-    api_key = os.getenv("OCR_API_KEY")  # Get OCR API key from environment
-
-    if not api_key:
-        return "Error: OCR API key is missing."  # Fail gracefully if no key
-
-    url = 'https://api.ocr.space/parse/image'  # OCR.Space API endpoint
-
-    # Try opening image file
+OCR_API_URL = os.getenv("OCR_API_URL", "https://api.ocr.space/parse/image")  # OCR.Space API endpoint
+OCR_MAX_SIDE = 2000  # Longest image side sent for OCR; larger photos are downscaled
+OCR_PASSTHROUGH_BYTES = 512 * 1024  # JPEG/PNG uploads at most this size are sent untouched
+OCR_JPEG_QUALITY = 85  # Keeps text edges crisp at a fraction of lossless size
+OCR_MAX_WORKERS = 4  # Concurrent OCR requests in batch mode
+OCR_RATE_PER_SECOND = 2.0  # Request rate cap toward the OCR endpoint
+OCR_TIMEOUT = (5, 60)  # (connect, read) timeout in seconds
+
+
+class RateLimiter:
+    # Spaces calls at least 1/rate seconds apart across all threads
+    def __init__(self, rate_per_second):
+        self.interval = 1.0 / rate_per_second
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        time.sleep(max(0.0, start - now))
+
+
+_ocr_limiter = None  # Process-wide OCR rate limiter (created on first use)
+_ocr_limiter_lock = threading.Lock()
+
+
+def get_ocr_limiter():
+    # One limiter per process, so every session and batch shares the OCR_RATE_PER_SECOND budget
+    global _ocr_limiter
+    with _ocr_limiter_lock:
+        if _ocr_limiter is None:
+            _ocr_limiter = RateLimiter(OCR_RATE_PER_SECOND)
+    return _ocr_limiter
+
+
+def prepare_ocr_image(data):
+    # Return (bytes, filename, mime type) of the smallest acceptable upload for an image.
+    # Small JPEG/PNG files pass through untouched; everything else is downscaled to
+    # OCR_MAX_SIDE and re-encoded as JPEG, or PNG when that is smaller (e.g. scans, line art).
+    from PIL import Image  # Python Imaging Library for image processing
+    image = Image.open(io.BytesIO(data))
+    if (image.format in ("JPEG", "PNG") and len(data) <= OCR_PASSTHROUGH_BYTES
+            and max(image.size) <= OCR_MAX_SIDE):
+        extension = "jpg" if image.format == "JPEG" else "png"
+        return data, f"image.{extension}", f"image/{image.format.lower()}"
+
+    image.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE))  # Keeps the aspect ratio; never upscales
+    if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+        # JPEG has no alpha: flatten onto white, or transparent areas turn black and hide the text
+        grayscale = image.mode == "LA"
+        image = image.convert("RGBA")
+        image = Image.alpha_composite(Image.new("RGBA", image.size, "white"), image)
+        image = image.convert("L" if grayscale else "RGB")
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("L" if image.mode in ("1", "LA") else "RGB")
+
+    candidates = []
+    jpeg = io.BytesIO()
+    image.save(jpeg, format="JPEG", quality=OCR_JPEG_QUALITY, optimize=True)
+    candidates.append((jpeg.getvalue(), "image.jpg", "image/jpeg"))
+    if image.mode == "L":
+        # Few-tone images often compress better losslessly
+        png = io.BytesIO()
+        image.save(png, format="PNG", optimize=True)
+        candidates.append((png.getvalue(), "image.png", "image/png"))
+    return min(candidates, key=lambda candidate: len(candidate[0]))
+
+
+def _ocr_image(uploaded_file, api_key, limiter=None):
+    # OCR one image; returns a dict with the text, bytes uploaded and request latency
+    import requests  # To make HTTP requests
+    report = {"text": "", "bytes_uploaded": 0, "latency": 0.0}
+
+    # Try opening and preparing the image
     try:
-        image = Image.open(uploaded_file)
+        payload, filename, mime = prepare_ocr_image(uploaded_file.getvalue())
     except Exception as e:
-        return f"Error: Unable to open image file. {str(e)}"
-
-    # Convert image to bytes
-    img_byte_arr = io.BytesIO()
-    image.save(img_byte_arr, format='PNG')  # Save image in PNG format
-    img_byte_arr = img_byte_arr.getvalue()  # Get byte data
+        report["text"] = f"Error: Unable to open image file. {str(e)}"
+        return report
+    report["bytes_uploaded"] = len(payload)
 
     # Send POST request to OCR.Space
+    if limiter:
+        limiter.wait()
+    start = time.perf_counter()
     try:
-        response = requests.post(
-            url,
-            files={'filename': ('image.png', img_byte_arr, 'image/png')},
-            data={'apikey': api_key, 'language': 'eng'}
+        response = get_http_session().post(
+            OCR_API_URL,
+            files={'filename': (filename, payload, mime)},
+            data={'apikey': api_key, 'language': 'eng'},
+            timeout=OCR_TIMEOUT
         )
     except requests.RequestException as e:
-        return f"Error: Request to OCR API failed. {str(e)}"
+        report["text"] = f"Error: Request to OCR API failed. {str(e)}"
+        return report
+    finally:
+        report["latency"] = time.perf_counter() - start
 
     # Try parsing JSON from response
     try:
         result = response.json()
     except ValueError:
-        return f"Error: Response from OCR.Space is not in valid JSON format. Response: {response.text}"
+        report["text"] = f"Error: Response from OCR.Space is not in valid JSON format. Response: {response.text}"
+        return report
 
     # Check for OCR failure
     if result.get("IsErroredOnProcessing"):
-        return f"OCR failed: {result.get('ErrorMessage', ['Unknown error'])[0]}"
+        report["text"] = f"OCR failed: {result.get('ErrorMessage', ['Unknown error'])[0]}"
+        return report
 
-    # Extract text from parsed result
+    # Extract text from parsed result and clean it with the shared pipeline
     extracted_text = result["ParsedResults"][0]["ParsedText"]
+    report["text"] = join_lines(clean_lines(extracted_text.split('\n')))
+    return report
 
-    # Clean up using regex filters
-    unwanted_patterns = [
-        r'.*indd.*',
-        r'^\s+$'
-    ]
 
-    full_text = ""
-    for line in extracted_text.split('\n'):
-        if any(re.match(pattern, line.strip()) for pattern in unwanted_patterns):
-            continue
-        if line.strip():
-            full_text += line.strip() + "\n"
+def extract_texts_from_images(uploaded_files, max_workers=OCR_MAX_WORKERS, limiter=None):
+    """
+    OCR a batch of images concurrently under the process-wide request-rate
+    limit (or the given RateLimiter).
+    Returns one report dict per image, in input order:
+    {"text": ..., "bytes_uploaded": ..., "latency": ...}.
+    """
+    api_key = os.getenv("OCR_API_KEY")  # Get OCR API key from environment
+    if not api_key:
+        return [{"text": "Error: OCR API key is missing.", "bytes_uploaded": 0, "latency": 0.0}
+                for _ in uploaded_files]  # Fail gracefully if no key
+
+    limiter = limiter or get_ocr_limiter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda file: _ocr_image(file, api_key, limiter), uploaded_files))
+
 
-    return full_text
+def extract_text_from_image(uploaded_file):
+    return extract_texts_from_images([uploaded_file], limiter=get_ocr_limiter())[0]["text"]
 
 # ================================
 # --- URL Article Extraction ---
 # ================================
+URL_TIMEOUT = (5, 30)  # (connect, read) timeout in seconds for article fetches
+URL_MAX_WORKERS = 8  # Concurrent fetches in batch mode
+URL_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+    )
+}
+
+_http_session = None  # Shared, connection-pooled HTTP session (created on first use)
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    # One pooled session per process so repeated fetches reuse TCP/TLS connections
+    global _http_session
+    import requests  # To make HTTP requests
+    import requests.adapters  # Connection pool sizing for the shared session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=URL_MAX_WORKERS, pool_maxsize=URL_MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(URL_HEADERS)
+            _http_session = session
+    return _http_session
+
+
+def parse_article(html):
+    from bs4 import BeautifulSoup  # For parsing HTML/XML content
+    from readability import Document as ReadabilityDocument  # Extracts main content from web articles
+
+    # Use readability to extract main content
+    doc = ReadabilityDocument(html)
+    title = doc.title()  # Extract article title
+    summary_html = doc.summary()  # Extract main article body as HTML
+
+    # Parse HTML to plain text
+    soup = BeautifulSoup(summary_html, 'html.parser')
+    text = soup.get_text(separator='\n')  # Join blocks with newline
+
+    # Start with the article title, then the cleaned article lines
+    return f"Title: {title}\n\n" + join_lines(clean_lines(text.split('\n')))
+
+
 def extract_text_from_url(url):
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-        )
-    }
+    # Cached pages are revalidated with a conditional GET; a 304 skips download and parsing
+    cache_key = f"{EXTRACTOR_VERSION}:{url}"
+    cached = http_cache.get_page(cache_key)
+    headers = {}
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
 
     try:
         # Send HTTP GET request to fetch URL contents
-        response = requests.get(url, headers=headers)
+        response = get_http_session().get(url, headers=headers, timeout=URL_TIMEOUT)
+        if cached and response.status_code == 304:
+            return cached[2]  # Unchanged since the last fetch
         response.raise_for_status()  # Raise error for bad responses
 
-        # Use readability to extract main content
-        doc = ReadabilityDocument(response.text)
-        title = doc.title()  # Extract article title
-        summary_html = doc.summary()  # Extract main article body as HTML
-
-        # Parse HTML to plain text
-        soup = BeautifulSoup(summary_html, 'html.parser')
-        text = soup.get_text(separator='\n')  # Join blocks with newline
-
-        # Clean with unwanted patterns
-        unwanted_patterns = [
-            r'.*indd.*',
-            r'^\s*$'  # Empty lines
-        ]
-
-        full_text = f"Title: {title}\n\n"  # Start with the article title
-
-        for line in text.split('\n'):
-            if not any(re.match(p, line.strip()) for p in unwanted_patterns):
-                full_text += line.strip() + "\n"  # Add only non-empty lines
-
-        return full_text  # Return full extracted and cleaned article text
+        text = parse_article(response.text)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            http_cache.put_page(cache_key, etag, last_modified, text)
+        return text
 
     except Exception as e:
         return f"Error extracting article: {e}"  # Gracefully handle all exceptions
+
+
+def extract_text_from_urls(urls, max_workers=URL_MAX_WORKERS):
+    # Fetch and parse several articles concurrently; results keep the order of `urls`
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(extract_text_from_url, urls))
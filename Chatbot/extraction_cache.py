@@ -0,0 +1,102 @@
+import hashlib  # SHA-256 digests of uploaded file bytes
+import os  # For reading configuration from environment variables
+import time  # Timestamps used for least-recently-used eviction
+import zlib  # Compress cached text to stretch the size cap
+
+import sqlite_cache  # Shared connection, counter and eviction helpers
+
+DB_PATH = os.getenv("ASTRADOC_EXTRACTION_DB", "astradoc_extractions.db")  # SQLite database file name
+MAX_BYTES = int(os.getenv("ASTRADOC_EXTRACTION_DB_MAX_BYTES", 256 * 1024 * 1024))  # Size cap before eviction
+
+
+def file_digest(data, file_ext, extractor_version):
+    """
+    Key for an upload: SHA-256 of its bytes plus the format and extractor
+    version, so a new extractor release never serves stale text.
+    """
+    digest = hashlib.sha256(data)
+    digest.update(f"\x1f{file_ext}\x1f{extractor_version}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def init_cache():
+    """
+    Create the extractions and stats tables if they don't exist.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS extractions (
+            digest TEXT PRIMARY KEY,  -- file_digest() of the upload
+            text BLOB,                -- zlib-compressed cleaned text
+            size INTEGER,             -- Size of the compressed text in bytes
+            last_used REAL            -- Unix time of the last read or write
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_last_used ON extractions (last_used)")
+    conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+    conn.commit()
+    conn.close()
+
+
+def get_text(digest):
+    """
+    Return the cached text for digest, or None on a miss. Every lookup is
+    counted as a hit or a miss.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    row = conn.execute("SELECT text FROM extractions WHERE digest = ?", (digest,)).fetchone()
+    if row is not None:
+        conn.execute("UPDATE extractions SET last_used = ? WHERE digest = ?", (time.time(), digest))
+    sqlite_cache.count(conn, "hits" if row is not None else "misses")
+    conn.commit()
+    conn.close()
+    return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+
+def has_text(digest):
+    """
+    Return whether text for digest is cached, without counting a lookup.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    row = conn.execute("SELECT 1 FROM extractions WHERE digest = ?", (digest,)).fetchone()
+    conn.close()
+    return row is not None
+
+
+def put_text(digest, text, max_bytes=MAX_BYTES):
+    """
+    Cache the extracted text for digest, then evict least recently used
+    entries until the cache is back under max_bytes.
+    """
+    blob = zlib.compress(text.encode("utf-8"))
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute(
+        "INSERT OR REPLACE INTO extractions (digest, text, size, last_used) VALUES (?, ?, ?, ?)",
+        (digest, blob, len(blob), time.time())
+    )
+    sqlite_cache.evict_lru(conn, "extractions", ("digest",), max_bytes)
+    conn.commit()
+    conn.close()
+
+
+def get_stats():
+    """
+    Return cache statistics as a dict: hits, misses, entries and bytes.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    stats = sqlite_cache.get_stats(conn, "extractions")
+    conn.close()
+    return stats
+
+
+def cached_extract(uploaded_file, file_ext, extractor, extractor_version):
+    """
+    Extract text from an uploaded file through the cache: re-uploads of the
+    same bytes skip parsing entirely.
+    """
+    digest = file_digest(uploaded_file.getvalue(), file_ext, extractor_version)
+    text = get_text(digest)
+    if text is None:
+        text = extractor(uploaded_file)
+        put_text(digest, text)
+    return text
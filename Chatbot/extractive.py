@@ -0,0 +1,99 @@
+# Local extractive pre-summarization: keep only a document's most informative sentences
+# before it is chunked and sent to the LLM.
+import re  # Normalization of repeated sentences
+import numpy as np  # Vectorized TF-IDF sentence scoring
+
+from chunker import iter_units  # Same sentence splitting and token counts as the chunker
+from retrieval import tokenize  # Same terms as the retrieval index
+
+# ================================
+# --- Configuration ---
+# ================================
+KEEP_RATIO = 0.4  # Default fraction of the document's tokens kept
+MIN_TOKENS = 6000  # Documents shorter than about two chunks are left untouched
+SENTENCE_TOKENS = 400  # Longer "sentences" (e.g. tables without punctuation) are split first
+
+_SPACES = re.compile(r"\s+")
+
+# ================================
+# --- Sentence Scoring ---
+# ================================
+def score_sentences(sentences):
+    """
+    Score every sentence by the cosine similarity between its TF-IDF vector
+    and the TF-IDF centroid of the whole document. The sparse sentence-term
+    matrix is kept as (row, column, weight) arrays, so memory grows with the
+    text and not with sentences x vocabulary.
+    """
+    vocabulary, rows, cols = {}, [], []
+    for row, sentence in enumerate(sentences):
+        for term in tokenize(sentence):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+    n_sentences, n_terms = len(sentences), len(vocabulary)
+    if not n_terms:
+        return np.zeros(n_sentences)
+
+    # Collapse repeated terms into (sentence, term) counts
+    pairs, counts = np.unique(np.array(rows, dtype=np.int64) * n_terms + np.array(cols), return_counts=True)
+    rows, cols = pairs // n_terms, pairs % n_terms
+
+    # Sublinear term frequency times smoothed inverse sentence frequency
+    sentence_frequency = np.bincount(cols, minlength=n_terms)
+    idf = np.log((1 + n_sentences) / (1 + sentence_frequency)) + 1
+    weights = (1 + np.log(counts)) * idf[cols]
+
+    centroid = np.bincount(cols, weights=weights, minlength=n_terms)
+    centroid /= np.linalg.norm(centroid)
+    dots = np.bincount(rows, weights=weights * centroid[cols], minlength=n_sentences)
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_sentences))
+    return np.divide(dots, norms, out=np.zeros(n_sentences), where=norms > 0)
+
+
+def _repeat_penalty(sentences):
+    # Repeated sentences (headers, footers, template clauses) keep only their first
+    # occurrence, and that one is discounted by how often it repeats
+    first, counts, keys = {}, {}, []
+    for index, sentence in enumerate(sentences):
+        key = _SPACES.sub(" ", sentence.lower()).strip()
+        first.setdefault(key, index)
+        counts[key] = counts.get(key, 0) + 1
+        keys.append(key)
+    return np.array([1.0 / counts[key] if first[key] == index else 0.0 for index, key in enumerate(keys)])
+
+# ================================
+# --- Condensing ---
+# ================================
+def condense(text, keep_ratio=KEEP_RATIO, min_tokens=MIN_TOKENS):
+    """
+    Return the highest-scoring sentences of `text`, worth about keep_ratio of
+    its tokens, in their original order and paragraphs. `text` may be a
+    string or a re-iterable of lines such as a stored Document. Text shorter
+    than min_tokens is returned unchanged.
+    """
+    units = list(iter_units(text.splitlines() if isinstance(text, str) else text, SENTENCE_TOKENS))
+    tokens = np.array([unit[1] for unit in units], dtype=np.int64)
+    if tokens.sum() <= min_tokens:
+        return text
+
+    sentences = [unit[0] for unit in units]
+    scores = score_sentences(sentences) * _repeat_penalty(sentences)
+
+    # Take sentences best-first until the token budget is spent
+    order = np.argsort(-scores, kind="stable")
+    within_budget = np.cumsum(tokens[order]) <= tokens.sum() * keep_ratio
+    keep = np.zeros(len(units), dtype=bool)
+    keep[order[within_budget]] = True
+    keep[order[0]] = True  # Never return an empty document
+
+    # Rebuild paragraphs: kept sentences of one paragraph are joined by spaces
+    paragraphs, current = [], []
+    for (sentence, _, ends_paragraph), kept in zip(units, keep):
+        if kept:
+            current.append(sentence)
+        if ends_paragraph and current:
+            paragraphs.append(" ".join(current))
+            current = []
+    if current:
+        paragraphs.append(" ".join(current))
+    return "\n".join(paragraphs)
@@ -0,0 +1,57 @@
+import os  # For reading configuration from environment variables
+import time  # Timestamps used for least-recently-used eviction
+
+import sqlite_cache  # Shared connection and eviction helpers
+
+DB_PATH = os.getenv("ASTRADOC_HTTP_CACHE_DB", "astradoc_http_cache.db")  # SQLite database file name
+MAX_BYTES = int(os.getenv("ASTRADOC_HTTP_CACHE_MAX_BYTES", 64 * 1024 * 1024))  # Size cap before eviction
+
+
+def init_cache():
+    """
+    Create the pages table if it doesn't exist. Each row holds the parsed
+    article text of a URL with the validators needed for a conditional GET.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,   -- Requested URL
+            etag TEXT,              -- ETag response header, sent back as If-None-Match
+            last_modified TEXT,     -- Last-Modified header, sent back as If-Modified-Since
+            text TEXT,              -- Extracted and cleaned article text
+            size INTEGER,           -- Size of the text in bytes
+            last_used REAL          -- Unix time of the last read or write
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_used ON pages (last_used)")
+    conn.commit()
+    conn.close()
+
+
+def get_page(url):
+    """
+    Return (etag, last_modified, text) for a cached URL, or None on a miss.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    row = conn.execute("SELECT etag, last_modified, text FROM pages WHERE url = ?", (url,)).fetchone()
+    if row is not None:
+        conn.execute("UPDATE pages SET last_used = ? WHERE url = ?", (time.time(), url))
+        conn.commit()
+    conn.close()
+    return row
+
+
+def put_page(url, etag, last_modified, text, max_bytes=MAX_BYTES):
+    """
+    Cache the parsed text of a URL with its validators, then evict least
+    recently used pages until the cache is back under max_bytes.
+    """
+    size = len(text.encode("utf-8"))
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute(
+        "INSERT OR REPLACE INTO pages (url, etag, last_modified, text, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+        (url, etag, last_modified, text, size, time.time())
+    )
+    sqlite_cache.evict_lru(conn, "pages", ("url",), max_bytes)
+    conn.commit()
+    conn.close()
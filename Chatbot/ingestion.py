@@ -0,0 +1,130 @@
+# Progressive PDF ingestion: pages are extracted range by range in the background, and
+# the text available so far can be questioned or summarized before the whole file is parsed.
+import hashlib  # Running digest of the text extracted so far
+import io  # In-memory buffers for the page count and line iteration
+import threading  # Background extraction thread and shared progress
+
+import extract  # Page-range PDF parsing and the shared cleaning pipeline
+import extraction_cache  # The finished text is cached like any other extraction
+import document_store  # The final text is a shared, memory-mapped document
+import metrics  # The worker runs in the context of the session that started it
+from chunker import chunk_text  # Passages of each page range
+from retrieval import BM25Index, PASSAGE_TOKENS, PASSAGE_OVERLAP  # Index grown range by range
+
+PROGRESSIVE_MIN_PAGES = 100  # Smaller PDFs parse in seconds and are ingested in one go
+
+
+def start_if_large(uploaded_file, file_ext):
+    """
+    Start progressive ingestion of an uploaded PDF of at least
+    PROGRESSIVE_MIN_PAGES pages whose text is not cached yet. Returns the
+    ProgressiveIngestion, or None when the file should be extracted in one go.
+    """
+    if file_ext != "pdf":
+        return None
+    data = uploaded_file.getvalue()
+    cache_digest = extraction_cache.file_digest(data, file_ext, extract.EXTRACTOR_VERSION)
+    if extraction_cache.has_text(cache_digest):
+        return None
+
+    from pypdf import PdfReader
+    if len(PdfReader(io.BytesIO(data)).pages) < PROGRESSIVE_MIN_PAGES:
+        return None
+    return ProgressiveIngestion(data, cache_digest)
+
+
+class PartialDocument:
+    """
+    The pages of a running ingestion extracted at one point in time. Like a
+    stored Document it has a digest and iterates over its lines, but its text
+    stays in memory and it carries the ingestion's growing retrieval index.
+    """
+
+    def __init__(self, parts, digest, index):
+        self._parts = parts
+        self.digest = digest  # Same as document_store.text_digest() of the text
+        self.index = index
+
+    def __bool__(self):
+        return True
+
+    def __str__(self):
+        return "".join(self._parts)
+
+    def __iter__(self):
+        for part in self._parts:
+            yield from io.StringIO(part)
+
+
+class ProgressiveIngestion:
+    """
+    Extract a PDF's pages in the background, appending the cleaned text of
+    each page range as it completes and indexing its passages. document()
+    returns a view of the pages done so far; once finished, `result` is the
+    whole, stored document.
+    """
+
+    def __init__(self, pdf_bytes, cache_digest, max_workers=None):
+        self.pages_done = 0
+        self.page_count = None
+        self.result = None  # Document of the whole text once finished
+        self.error = None
+        self._parts = []  # Cleaned text of each completed page range
+        self._digest = hashlib.sha256()  # Digest of the parts so far, updated range by range
+        self._snapshot = None  # PartialDocument of the last call to document()
+        self.index = BM25Index([])  # Passages of every completed range, extended as ranges arrive
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(
+            target=metrics.bind_context(self._run), args=(pdf_bytes, cache_digest, max_workers), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, pdf_bytes, cache_digest, max_workers):
+        ranges = extract.iter_pdf_page_ranges(pdf_bytes, max_workers)
+        try:
+            for pages_done, page_count, pages in ranges:
+                if self._cancel.is_set():
+                    return
+                lines = (line for page in pages for line in page.split("\n"))
+                text = extract.join_lines(extract.clean_lines(lines))
+                # Passages do not span page ranges, so each range is indexed once, on arrival
+                self.index.add(list(chunk_text(text, PASSAGE_TOKENS, PASSAGE_OVERLAP)))
+                with self._lock:
+                    self._parts.append(text)
+                    self._digest.update(text.encode("utf-8"))
+                    self.pages_done, self.page_count = pages_done, page_count
+            text = self.text()
+            extraction_cache.put_text(cache_digest, text)  # Re-uploads skip parsing, as for other files
+            self.result = document_store.put_text(text)
+        except Exception as e:
+            self.error = e
+        finally:
+            ranges.close()  # Cancels page ranges not yet started
+
+    @property
+    def done(self):
+        return self.result is not None or self.error is not None
+
+    def cancel(self):
+        self._cancel.set()
+
+    def text(self):
+        # Text of the pages extracted so far; identical to extract_text() once finished
+        with self._lock:
+            return "".join(self._parts)
+
+    def document(self):
+        """
+        The whole document once finished, otherwise a PartialDocument of the
+        pages done so far (the same object until more pages arrive), or None
+        if no page range has completed yet. Nothing is written to disk.
+        """
+        if self.result is not None:
+            return self.result
+        with self._lock:
+            if not self._parts:
+                return None
+            if self._snapshot is None or len(self._snapshot._parts) != len(self._parts):
+                self._snapshot = PartialDocument(tuple(self._parts), self._digest.hexdigest(), self.index)
+            return self._snapshot
@@ -0,0 +1,109 @@
+# Import required modules and libraries
+import contextvars  # Background refreshes run in the context (e.g. session) of the turn that scheduled them
+import threading  # Protects the rolling summary shared with the background worker
+from concurrent.futures import ThreadPoolExecutor  # Background summary refreshes
+
+from chunker import chunk_text, count_tokens  # Token counting and truncation
+
+# ================================
+# --- Configuration ---
+# ================================
+HISTORY_TOKENS = 3000  # Token budget for the conversation part of every chat prompt
+SUMMARY_TOKENS = 400  # Maximum length of the rolling summary of older turns
+FOLD_TOKENS = 3000  # Maximum older-turn tokens folded into the summary per refresh
+
+# A small pool shared by all sessions, so summaries never crowd out chat calls
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-memory")
+
+
+def truncate_tokens(text, max_tokens):
+    # Keep the leading max_tokens tokens of a message, cut on a sentence boundary
+    if count_tokens(text) <= max_tokens:
+        return text
+    return next(chunk_text(text, max_tokens, 0), "") + " [...]"
+
+# ================================
+# --- Conversation Memory ---
+# ================================
+class ConversationMemory:
+    """
+    Keeps chat prompts within a fixed token budget. Recent turns are sent
+    verbatim; turns that fall out of the verbatim window are folded into a
+    rolling summary by a background job, so building a prompt never waits on
+    the model and prompt size stays flat however long the conversation gets.
+
+    summarize_fn(previous_summary, messages) must return the new summary text.
+    """
+
+    def __init__(self, summarize_fn, budget=HISTORY_TOKENS, summary_tokens=SUMMARY_TOKENS):
+        self.summarize_fn = summarize_fn
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.summary = ""  # Rolling summary of history[:summarized_upto]
+        self.summarized_upto = 0
+        self._future = None  # In-flight background refresh, if any
+        self._lock = threading.Lock()
+
+    def build_messages(self, history):
+        """
+        Return the messages to send for `history` (a list of role/content
+        dicts ending with the newest user turn): the rolling summary, then as
+        many recent turns as fit in the budget.
+        """
+        with self._lock:
+            summary = self.summary
+            summarized_upto = self.summarized_upto
+
+        # Fill the verbatim window from the newest turn backwards
+        remaining = max(self.budget - (count_tokens(summary) if summary else 0), self.budget // 2)
+        recent = []
+        start = len(history)
+        for message in reversed(history[summarized_upto:]):
+            content = message["content"]
+            tokens = count_tokens(content)
+            if tokens > remaining:
+                if recent:
+                    break
+                # The newest turn alone is over budget (e.g. a pasted document): truncate it
+                content = truncate_tokens(content, remaining)
+                tokens = remaining
+            recent.insert(0, {"role": message["role"], "content": content})
+            remaining -= tokens
+            start -= 1
+
+        # Older turns outside the window are folded into the summary in the background
+        if start > summarized_upto:
+            self._schedule_refresh(history[summarized_upto:start], summarized_upto)
+
+        messages = []
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        return messages + recent
+
+    def _schedule_refresh(self, pending, summarized_upto):
+        # Start at most one refresh at a time; later calls pick up whatever is still pending
+        with self._lock:
+            if self._future is not None and not self._future.done():
+                return
+            batch, tokens = [], 0
+            for message in pending:
+                content = truncate_tokens(message["content"], FOLD_TOKENS // 2)
+                tokens += count_tokens(content)
+                if batch and tokens > FOLD_TOKENS:
+                    break
+                batch.append({"role": message["role"], "content": content})
+            self._future = _executor.submit(
+                contextvars.copy_context().run, self._refresh, self.summary, batch, summarized_upto
+            )
+
+    def _refresh(self, previous_summary, batch, summarized_upto):
+        # Runs on the background executor; a failed refresh is simply retried on the next turn
+        try:
+            summary = self.summarize_fn(previous_summary, batch)
+        except Exception:
+            return
+        summary = truncate_tokens(summary, self.summary_tokens)
+        with self._lock:
+            if self.summarized_upto == summarized_upto:
+                self.summary = summary
+                self.summarized_upto = summarized_upto + len(batch)
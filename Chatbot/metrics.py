@@ -0,0 +1,117 @@
+import contextvars  # Session label that follows a request into worker threads
+import json  # Optional JSONL mirror of every record
+import os  # For reading configuration from environment variables
+import threading  # Serializes JSONL appends
+
+import sqlite_cache  # Shared connection helper
+
+DB_PATH = os.getenv("ASTRADOC_METRICS_DB", "astradoc_metrics.db")  # SQLite database file name
+JSONL_PATH = os.getenv("ASTRADOC_METRICS_JSONL")  # Also append every record to this file when set
+MAX_ROWS = int(os.getenv("ASTRADOC_METRICS_MAX_ROWS", 100000))  # Only the most recent calls are kept
+
+# Session that model calls are attributed to; set once per Streamlit script run.
+# Worker threads see it when they are started through bind_context().
+current_session = contextvars.ContextVar("astradoc_session", default=None)
+
+_jsonl_lock = threading.Lock()
+
+
+def bind_context(fn):
+    """
+    Wrap fn so it runs with the caller's context (and so its session) when
+    called from a worker thread.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def init_metrics():
+    """
+    Create the calls table if it doesn't exist. Each row is one model call.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS calls (
+            ts REAL,                 -- Unix time the call started
+            session TEXT,            -- Streamlit session id, NULL for headless runs
+            stage TEXT,              -- chat, memory, summarize, merge, qa, batch_qa or corpus_qa
+            model TEXT,              -- Model name
+            wall REAL,               -- Seconds from request to last token
+            ttft REAL,               -- Seconds to the first streamed token (NULL when not streamed)
+            prompt_tokens INTEGER,   -- From response.usage, or estimated when not reported
+            completion_tokens INTEGER,
+            estimated INTEGER,       -- 1 when token counts are local estimates
+            ok INTEGER               -- 0 when the call raised
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_session ON calls (session)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_ts ON calls (ts)")
+    conn.commit()
+    conn.close()
+
+
+def record_call(stage, model, start, wall, ttft, prompt_tokens, completion_tokens, estimated, ok):
+    """
+    Store one call record and trim the table to the newest MAX_ROWS rows.
+    """
+    row = {
+        "ts": start, "session": current_session.get(), "stage": stage, "model": model, "wall": wall,
+        "ttft": ttft, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+        "estimated": int(estimated), "ok": int(ok),
+    }
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute(
+        "INSERT INTO calls (ts, session, stage, model, wall, ttft, prompt_tokens, completion_tokens, estimated, ok) "
+        "VALUES (:ts, :session, :stage, :model, :wall, :ttft, :prompt_tokens, :completion_tokens, :estimated, :ok)",
+        row
+    )
+    conn.execute("DELETE FROM calls WHERE rowid <= (SELECT MAX(rowid) FROM calls) - ?", (MAX_ROWS,))
+    conn.commit()
+    conn.close()
+
+    if JSONL_PATH:
+        with _jsonl_lock, open(JSONL_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row) + "\n")
+
+
+def _percentile(values, fraction):
+    # Nearest-rank percentile of an ascending list
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def get_summary(session=None, since=None):
+    """
+    Aggregate call records, for one session or all of them, optionally only
+    those started after `since` (Unix time). Returns a dict per stage plus
+    "all": calls, errors, p50/p95 wall time and TTFT, prompt/completion tokens.
+    """
+    query = "SELECT stage, wall, ttft, prompt_tokens, completion_tokens, ok FROM calls WHERE 1 = 1"
+    params = []
+    if session is not None:
+        query += " AND session = ?"
+        params.append(session)
+    if since is not None:
+        query += " AND ts >= ?"
+        params.append(since)
+    conn = sqlite_cache.connect(DB_PATH)
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
+
+    groups = {"all": rows}
+    for row in rows:
+        groups.setdefault(row[0], []).append(row)
+    summary = {}
+    for stage, stage_rows in groups.items():
+        walls = sorted(row[1] for row in stage_rows if row[5])
+        ttfts = sorted(row[2] for row in stage_rows if row[5] and row[2] is not None)
+        summary[stage] = {
+            "calls": len(stage_rows),
+            "errors": sum(1 for row in stage_rows if not row[5]),
+            "p50": _percentile(walls, 0.50), "p95": _percentile(walls, 0.95),
+            "ttft_p50": _percentile(ttfts, 0.50), "ttft_p95": _percentile(ttfts, 0.95),
+            "prompt_tokens": sum(row[3] or 0 for row in stage_rows),
+            "completion_tokens": sum(row[4] or 0 for row in stage_rows),
+        }
+    return summary
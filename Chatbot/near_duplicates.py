@@ -0,0 +1,90 @@
+# MinHash signatures and LSH banding for near-duplicate chunk detection.
+# Chunks of repeated boilerplate (contract clauses, legal footers, slide templates)
+# are found in one pass and summarized once instead of once per copy. Only virtually
+# identical chunks with exactly the same numbers qualify, so a revised clause or a
+# changed amount is always summarized again.
+import os  # For reading configuration from environment variables
+import re  # Word splitting for shingles
+import zlib  # Fast, process-stable shingle hashes
+import numpy as np  # Vectorized MinHash permutations
+
+# ================================
+# --- Configuration ---
+# ================================
+NUM_PERM = 64  # MinHash permutations per signature
+BANDS = 16  # LSH bands; BANDS * ROWS must equal NUM_PERM
+ROWS = 4  # Signature rows per band: pairs above ~50% similarity become candidates
+SHINGLE_WORDS = 5  # Words per shingle
+SIMILARITY = 0.98  # Estimated Jaccard similarity at which two chunks count as duplicates
+SIGNATURE_VERSION = 2  # Part of every bucket key; bump when signatures change
+# Reusing the stored summary of a near-identical chunk from another document is opt-in:
+# a revised document must have its edited chunks summarized again
+ACROSS_DOCUMENTS = os.getenv("ASTRADOC_NEAR_DUPLICATES_ACROSS_DOCUMENTS", "0") == "1"
+
+_PRIME = (1 << 31) - 1  # Mersenne prime for the universal hash family
+_WORD_PATTERN = re.compile(r"\w+")
+_NUMBER_PATTERN = re.compile(r"\d+")
+
+# Fixed seed: signatures must match across processes and runs to be stored and compared
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+
+# ================================
+# --- Signatures ---
+# ================================
+def signature(text):
+    # MinHash signature of the text's word shingles (NUM_PERM unsigned integers), followed
+    # by a fingerprint of every number in the text, in order
+    words = _WORD_PATTERN.findall(text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles), dtype=np.uint64)
+    numbers = zlib.crc32(" ".join(_NUMBER_PATTERN.findall(text)).encode("utf-8"))
+    return np.append(((_A * hashes + _B) % _PRIME).min(axis=1), np.uint64(numbers))
+
+
+def similarity(first, second):
+    # Estimated Jaccard similarity of the shingle sets behind two signatures; 0 when the
+    # texts' numbers differ (or a signature predates the numbers fingerprint)
+    if len(first) != NUM_PERM + 1 or len(second) != NUM_PERM + 1 or first[-1] != second[-1]:
+        return 0.0
+    return float(np.mean(first[:NUM_PERM] == second[:NUM_PERM]))
+
+
+def band_keys(sig, scope=""):
+    # One bucket key per band; chunks sharing any bucket are candidate duplicates.
+    # `scope` keeps buckets of unrelated uses (e.g. summary styles) apart.
+    return [
+        f"{scope}:v{SIGNATURE_VERSION}:{band}:{sig[band * ROWS:(band + 1) * ROWS].tobytes().hex()}"
+        for band in range(BANDS)
+    ]
+
+
+def to_bytes(sig):
+    return sig.astype(np.uint64).tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(data, dtype=np.uint64)
+
+# ================================
+# --- Duplicate Grouping ---
+# ================================
+def find_duplicates(signatures, threshold=SIMILARITY):
+    """
+    Map every signature to the index of the first earlier signature it
+    near-duplicates, or to its own index when it is the first of its kind.
+    """
+    buckets, representatives = {}, []
+    for index, sig in enumerate(signatures):
+        keys = band_keys(sig)
+        match = index
+        for candidate in sorted({c for key in keys for c in buckets.get(key, ())}):
+            if similarity(sig, signatures[candidate]) >= threshold:
+                match = candidate
+                break
+        representatives.append(match)
+        if match == index:
+            for key in keys:
+                buckets.setdefault(key, []).append(index)
+    return representatives
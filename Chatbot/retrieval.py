@@ -0,0 +1,102 @@
+# Import required modules and libraries
+import heapq  # Efficient top-k selection
+import math  # Logarithms for inverse document frequency
+import re  # Regular expressions module
+from collections import Counter, defaultdict  # Term frequency counting and posting lists
+from collections.abc import Sequence  # Passages may be a lazily decoded, memory-mapped sequence
+
+from chunker import chunk_text  # Passages are built from the shared chunker
+
+# ================================
+# --- Configuration ---
+# ================================
+PASSAGE_TOKENS = 400  # Token size of each retrievable passage
+PASSAGE_OVERLAP = 50  # Token overlap between neighbouring passages
+TOP_K = 5  # Number of passages sent to the model per question
+
+# Very common English words that carry no retrieval signal
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have he her his how i if in into is it its
+me my no not of on or our she so that the their them then there these they this to
+was we were what when where which who whom why will with would you your
+""".split())
+
+_TERM_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    # Lowercase word terms with stop words removed
+    return [term for term in _TERM_PATTERN.findall(text.lower()) if term not in STOP_WORDS]
+
+# ================================
+# --- BM25 Index ---
+# ================================
+class BM25Index:
+    """
+    Okapi BM25 lexical index over the passages of a document. The index is
+    built once when a document is processed and queried for every question.
+    """
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages if isinstance(passages, Sequence) else list(passages)
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(passage_id, term_frequency), ...]
+        self.lengths = []
+
+        for passage_id, passage in enumerate(self.passages):
+            terms = tokenize(passage)
+            self.lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings[term].append((passage_id, frequency))
+        self._update_statistics()
+
+    def _update_statistics(self):
+        count = len(self.passages)
+        self.average_length = (sum(self.lengths) / count) if count else 0
+        # Precompute inverse document frequency for every term
+        self.idf = {
+            term: math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def add(self, passages):
+        # Index more passages when `self.passages` is a list (e.g. a PDF still being parsed).
+        # Passages and lengths are extended before the postings, so a search running in
+        # another thread never meets a passage id it cannot score.
+        counts = [Counter(tokenize(passage)) for passage in passages]
+        start = len(self.passages)
+        self.passages.extend(passages)
+        self.lengths.extend(sum(terms.values()) for terms in counts)
+        for offset, terms in enumerate(counts):
+            for term, frequency in terms.items():
+                self.postings[term].append((start + offset, frequency))
+        self._update_statistics()
+
+    @classmethod
+    def from_text(cls, text, passage_tokens=PASSAGE_TOKENS, overlap=PASSAGE_OVERLAP):
+        # Split a document into passages with chunk_text and index them
+        return cls(chunk_text(text, passage_tokens, overlap))
+
+    def scores(self, query):
+        # Accumulate BM25 scores only for passages that share a term with the query
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for passage_id, frequency in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[passage_id] / self.average_length)
+                scores[passage_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+    def search(self, query, top_k=TOP_K):
+        # Return the ids of the top_k passages, in document order for readable context
+        scores = self.scores(query)
+        best = heapq.nlargest(top_k, scores, key=scores.get)
+        return sorted(best)
+
+    def top_passages(self, query, top_k=TOP_K):
+        # Return the text of the best passages; fall back to the opening passages on no match
+        ids = self.search(query, top_k) or list(range(min(top_k, len(self.passages))))
+        return [self.passages[passage_id] for passage_id in ids]
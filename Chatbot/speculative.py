@@ -0,0 +1,69 @@
+# Speculative summaries: start the summary most users ask for as soon as a document is
+# processed, so the "Generate Summary" click usually finds it finished, or at least finds
+# its finished chunk summaries in the summary store.
+import os  # For reading configuration from environment variables
+import threading  # Cancellation flags and the global job cap
+from concurrent.futures import ThreadPoolExecutor  # Background summary jobs
+
+from core import summarize_file  # The same summary the click would produce (and store)
+import metrics  # Attribute the job's model calls to the session that started it
+
+# ================================
+# --- Configuration ---
+# ================================
+SPECULATIVE_STYLE = "Brief"  # Default style in the summary UI, and the one nearly always requested
+MAX_JOBS = int(os.getenv("ASTRADOC_SPECULATIVE_JOBS", 2))  # Concurrent background summaries across all sessions
+JOB_WORKERS = 2  # Concurrent model calls per background summary, so jobs never crowd out user requests
+
+# Shared by every session in the server process; documents processed while all slots
+# are busy are simply not speculated on
+_executor = ThreadPoolExecutor(max_workers=MAX_JOBS, thread_name_prefix="speculative-summary")
+_slots = threading.BoundedSemaphore(MAX_JOBS)
+
+# ================================
+# --- Background Jobs ---
+# ================================
+class SpeculativeSummary:
+    """
+    Handle on a background summary of one document. result() returns it once
+    done(); cancel() stops it before its next model call.
+    """
+
+    def __init__(self, text, summary_type):
+        self.summary_type = summary_type
+        self.digest = getattr(text, "digest", None)  # Stored document the summary belongs to
+        self.stats = {}
+        self._cancel = threading.Event()
+        self._future = _executor.submit(metrics.bind_context(self._run), text)
+
+    def _run(self, text):
+        try:
+            return summarize_file(text, self.summary_type, max_workers=JOB_WORKERS, stats=self.stats,
+                                  cancel=self._cancel)
+        finally:
+            _slots.release()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def done(self):
+        return self._future.done()
+
+    def result(self, timeout=None):
+        # The summary, or None if the job was cancelled or failed (the caller then runs it itself)
+        if self._cancel.is_set():
+            return None
+        try:
+            return self._future.result(timeout)
+        except Exception:  # Includes the CancelledError of a cancelled run
+            return None
+
+
+def start(text, summary_type=SPECULATIVE_STYLE):
+    """
+    Start summarizing text in the background and return its
+    SpeculativeSummary, or None when the global job cap is reached.
+    """
+    if not _slots.acquire(blocking=False):
+        return None
+    return SpeculativeSummary(text, summary_type)
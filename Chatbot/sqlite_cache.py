@@ -0,0 +1,50 @@
+import sqlite3  # SQLite database module shared by the on-disk caches and stores
+
+
+def connect(path):
+    """
+    Open a short-lived connection to the database at path. One connection per
+    call keeps the caches safe to use across sessions and worker threads.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers do not block the writer
+    return conn
+
+
+def count(conn, name):
+    # Increment a hit/miss counter in the stats table
+    conn.execute(
+        "INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+        (name,)
+    )
+
+
+def get_stats(conn, table):
+    """
+    Return statistics of a counted cache as a dict: hits, misses, and the
+    entries and bytes held in table.
+    """
+    stats = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+    entries, size = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {table}").fetchone()
+    return {"hits": stats.get("hits", 0), "misses": stats.get("misses", 0), "entries": entries, "bytes": size}
+
+
+def evict_lru(conn, table, key_columns, max_bytes):
+    """
+    Delete least recently used rows of table (by its size and last_used
+    columns) until the rows total at most max_bytes. Returns the key tuples
+    of the deleted rows, so callers can drop rows that refer to them.
+    """
+    total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {table}").fetchone()[0]
+    if total <= max_bytes:
+        return []
+    columns = ", ".join(key_columns)
+    expired = []
+    for row in conn.execute(f"SELECT {columns}, size FROM {table} ORDER BY last_used"):
+        if total <= max_bytes:
+            break
+        expired.append(row[:-1])
+        total -= row[-1]
+    where = " AND ".join(f"{column} = ?" for column in key_columns)
+    conn.executemany(f"DELETE FROM {table} WHERE {where}", expired)
+    return expired
@@ -0,0 +1,131 @@
+# Local OpenAI-compatible stub server for offline benchmarks.
+# Usage: python stub_llm.py --port 8001 --latency 0.3 --tokens-per-second 50
+import argparse  # Command-line argument parsing
+import json  # Request and response bodies
+import threading  # Server thread and thread-safe counters
+import time  # Simulated latency and generation speed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Minimal concurrent HTTP server
+
+from chunker import count_tokens  # Token accounting for prompts and completions
+
+# ================================
+# --- Request Handler ---
+# ================================
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass  # Keep benchmark output clean
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        messages = body.get("messages", [])
+        prompt_tokens = sum(count_tokens(message.get("content") or "") for message in messages)
+        completion_tokens = min(body.get("max_tokens") or stub.reply_tokens, stub.reply_tokens)
+        words = ["lorem"] * completion_tokens
+        words[-1] += "."
+        stub.record(prompt_tokens, completion_tokens)
+
+        time.sleep(stub.latency)  # Time to first token
+        if body.get("stream"):
+            self._stream(body, words, stub)
+        else:
+            time.sleep(completion_tokens / stub.tokens_per_second)
+            self._send_json({
+                "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            })
+
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, body, words, stub):
+        # Server-sent events, one chunk per token, paced at tokens_per_second
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for index, word in enumerate(words):
+            event = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": body.get("model"),
+                     "choices": [{"index": 0, "delta": {"content": (" " if index else "") + word},
+                                  "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(1 / stub.tokens_per_second)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+# ================================
+# --- Stub Server ---
+# ================================
+class StubLLMServer:
+    """
+    OpenAI-compatible /v1/chat/completions endpoint with configurable
+    time-to-first-token and generation speed. Counts calls and tokens so
+    benchmarks can report what each stage would have sent to the real model.
+    """
+
+    def __init__(self, latency=0.2, tokens_per_second=200.0, reply_tokens=120, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self._lock = threading.Lock()
+        self.reset()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record(self, prompt_tokens, completion_tokens):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--reply-tokens", type=int, default=120)
+    args = parser.parse_args()
+
+    stub = StubLLMServer(args.latency, args.tokens_per_second, args.reply_tokens, port=args.port).start()
+    print(f"Stub LLM listening on {stub.base_url} (set NVIDIA_BASE_URL to this)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
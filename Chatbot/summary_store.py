@@ -0,0 +1,116 @@
+import hashlib  # Content hashing for cache keys
+import os  # For reading configuration from environment variables
+import time  # Timestamps used for least-recently-used eviction
+
+import sqlite_cache  # Shared connection and eviction helpers
+
+DB_PATH = os.getenv("ASTRADOC_SUMMARY_DB", "astradoc_summaries.db")  # SQLite database file name
+MAX_BYTES = int(os.getenv("ASTRADOC_SUMMARY_DB_MAX_BYTES", 64 * 1024 * 1024))  # Size cap before eviction
+
+
+def make_key(*parts):
+    """
+    Build a content-addressed key from its parts, e.g. the chunk text,
+    summary type, model name and prompt version.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")  # Separator so ("ab", "c") and ("a", "bc") differ
+    return digest.hexdigest()
+
+
+def init_store():
+    """
+    Create the summaries table if it doesn't exist. Each row holds one
+    chunk-level (or merged) summary with its size and last access time.
+    Chunk summaries may also have a MinHash signature and LSH buckets, so a
+    near-identical chunk can reuse them.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS summaries (
+            key TEXT PRIMARY KEY,   -- make_key() hash of the inputs
+            summary TEXT,           -- LLM output for those inputs
+            size INTEGER,           -- Size of the summary in bytes
+            last_used REAL          -- Unix time of the last read or write
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_used ON summaries (last_used)")
+    # MinHash signatures of summarized chunks and their LSH buckets, for near-duplicate reuse
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS signatures (
+            key TEXT PRIMARY KEY,   -- Key of the summary in the summaries table
+            signature BLOB          -- MinHash signature of the chunk text
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS buckets (
+            bucket TEXT,            -- LSH band key
+            key TEXT                -- Key of a summary whose chunk falls in the bucket
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_bucket ON buckets (bucket)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_key ON buckets (key)")  # Deletes by summary key
+    conn.commit()
+    conn.close()
+
+
+def get_summary(key):
+    """
+    Return the stored summary for key, or None on a miss. A hit refreshes
+    the entry's last access time.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    row = conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+    if row is not None:
+        conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+    conn.close()
+    return row[0] if row else None
+
+
+def put_summary(key, summary, max_bytes=MAX_BYTES):
+    """
+    Store a summary under key, then evict least recently used entries until
+    the store is back under max_bytes.
+    """
+    size = len(summary.encode("utf-8"))
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute(
+        "INSERT OR REPLACE INTO summaries (key, summary, size, last_used) VALUES (?, ?, ?, ?)",
+        (key, summary, size, time.time())
+    )
+    expired = sqlite_cache.evict_lru(conn, "summaries", ("key",), max_bytes)
+    if expired:
+        conn.executemany("DELETE FROM signatures WHERE key = ?", expired)
+        conn.executemany("DELETE FROM buckets WHERE key = ?", expired)
+    conn.commit()
+    conn.close()
+
+
+def put_signature(key, buckets, signature):
+    """
+    Record the signature (bytes) and LSH buckets of the chunk stored under key.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    conn.execute("INSERT OR REPLACE INTO signatures (key, signature) VALUES (?, ?)", (key, signature))
+    conn.execute("DELETE FROM buckets WHERE key = ?", (key,))
+    conn.executemany("INSERT INTO buckets (bucket, key) VALUES (?, ?)", [(bucket, key) for bucket in buckets])
+    conn.commit()
+    conn.close()
+
+
+def get_candidates(buckets):
+    """
+    Return (key, signature bytes) of stored summaries sharing at least one
+    of the given LSH buckets.
+    """
+    conn = sqlite_cache.connect(DB_PATH)
+    rows = conn.execute(
+        f"""SELECT DISTINCT s.key, s.signature FROM buckets b JOIN signatures s ON s.key = b.key
+            WHERE b.bucket IN ({",".join("?" * len(buckets))})""",
+        buckets
+    ).fetchall()
+    conn.close()
+    return rows
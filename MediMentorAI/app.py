@@ -1,17 +1,21 @@
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # Run independent network calls concurrently
 from gemini import get_conditions, get_health_tips, get_medicine_info
 from utils import (
     get_specialist, get_risk_level, export_to_pdf,
     suggest_medicines, medicine_info_links,
-    get_lat_lng_from_pincode_nominatim, get_hospitals_nearby_overpass
+    get_hospitals_near_pincode
 )
 from database import init_db, save_symptom_history  # Import functions to initialize DB and save history
+from response_cache import init_cache, get_stats  # Persistent cache of Gemini responses and its hit rates
 
 # Set Streamlit page configuration: title, layout, and icon in browser tab
 st.set_page_config(page_title="MediMentor AI – Your Health Companion", layout="centered", page_icon="🧠")
 
 # Initialize the SQLite database and create tables if they don't exist
 init_db()
+# Create the Gemini response cache tables if they don't exist
+init_cache()
 
 # --- Custom CSS styling injected into the Streamlit app ---
 st.markdown("""
@@ -65,6 +69,14 @@ if med_name.strip():
             # Show error message if fetching fails
             st.sidebar.error(f"❌ Could not fetch info: {e}")
 
+# --- Sidebar caption with the response cache hit rate ---
+cache_stats = get_stats()["all"]
+if cache_stats["hit_rate"] is not None:
+    st.sidebar.caption(
+        f"⚡ {cache_stats['hit_rate']:.0%} of AI answers served from cache "
+        f"({cache_stats['hits']} of {cache_stats['hits'] + cache_stats['misses']})"
+    )
+
 # --- Main Page Title & Description ---
 st.markdown('<div class="big-title">🧠 MediMentor AI – Your Health Companion</div>', unsafe_allow_html=True)
 st.markdown(
@@ -85,73 +97,93 @@ if st.button("🔍 Analyze"):
     if not symptoms.strip():
         st.warning("⚠️ Please enter some symptoms.")  # Warn user to input symptoms
     else:
-        # Show spinner while analysis runs
-        with st.spinner("🧠 MediMentor AI is analyzing your symptoms..."):
-            try:
-                # Use Gemini AI API to get probable conditions from symptoms
-                conditions = get_conditions(symptoms)
-                # Get health tips related to symptoms
-                tips = get_health_tips(symptoms)
-                # Get recommended medical specialist for symptoms
-                specialist = get_specialist(symptoms)
-                # Get risk level assessment from symptoms
-                risk_level = get_risk_level(symptoms)
-                
-                # Save symptom analysis results into SQLite database
-                save_symptom_history(symptoms, conditions, tips)
-
-                # Display the results on the UI in separate sections with styled headers
-                st.markdown('<div class="section-header">🔬 Most Probable Conditions</div>', unsafe_allow_html=True)
-                st.success(conditions)  # Show probable conditions in success message box
-
-                st.markdown('<div class="section-header">👨‍⚕️ Recommended Specialist</div>', unsafe_allow_html=True)
-                st.info(specialist)  # Show recommended specialist info box
-
-                st.markdown('<div class="section-header">🚦 Risk Level</div>', unsafe_allow_html=True)
-                st.warning(risk_level)  # Show risk level with warning style
-
-                st.markdown('<div class="section-header">💡 Helpful Health Tips</div>', unsafe_allow_html=True)
-                st.info(tips)  # Show health tips in info box
-
-                # Suggest medicines based on symptoms
-                medicines = suggest_medicines(symptoms)
-                if medicines:
-                    st.markdown('<div class="section-header">💊 Suggested Medicines</div>', unsafe_allow_html=True)
-                    # Display clickable links for medicine info
-                    for med_link in medicine_info_links(medicines):
-                        st.markdown(med_link)
-                else:
-                    # Inform if no medicine suggestions are available
-                    st.info("No medicine suggestions available for the entered symptoms.")
-
-                # Provide option to export the report as PDF and show the download link
-                st.markdown('<div class="section-header">📄 Export Report</div>', unsafe_allow_html=True)
-                pdf_link = export_to_pdf(symptoms, conditions, specialist, risk_level, tips)
-                st.markdown(pdf_link, unsafe_allow_html=True)
-
-                # If user entered a pincode, attempt to fetch nearby hospitals
-                if pincode.strip():
-                    with st.spinner(f"Fetching hospitals near {pincode}..."):
-                        try:
-                            # Get latitude and longitude for the pincode using Nominatim API
-                            lat, lon = get_lat_lng_from_pincode_nominatim(pincode.strip())
-                            # Fetch list of nearby hospitals using Overpass API
-                            hospitals = get_hospitals_nearby_overpass(lat, lon)
-                            if hospitals:
+        # Specialist, risk level and medicines are local keyword lookups, so they are ready at once
+        specialist = get_specialist(symptoms)
+        risk_level = get_risk_level(symptoms)
+        medicines = suggest_medicines(symptoms)
+
+        # One placeholder per section keeps the page order fixed while parts finish in any order
+        sections = {
+            name: st.empty()
+            for name in ["conditions", "specialist", "risk", "tips", "medicines", "export", "hospitals"]
+        }
+
+        def show_section(name, header, body, style):
+            # Replace a section's placeholder with its header and a styled message box
+            with sections[name].container():
+                st.markdown(f'<div class="section-header">{header}</div>', unsafe_allow_html=True)
+                style(body)
+
+        show_section("specialist", "👨‍⚕️ Recommended Specialist", specialist, st.info)
+        show_section("risk", "🚦 Risk Level", risk_level, st.warning)
+        with sections["medicines"].container():
+            if medicines:
+                st.markdown('<div class="section-header">💊 Suggested Medicines</div>', unsafe_allow_html=True)
+                # Display clickable links for medicine info
+                for med_link in medicine_info_links(medicines):
+                    st.markdown(med_link)
+            else:
+                # Inform if no medicine suggestions are available
+                st.info("No medicine suggestions available for the entered symptoms.")
+
+        # Analysis as a dependency graph: both Gemini calls run alongside the geocode → hospitals
+        # chain; the PDF and the history record only need conditions and tips, so they start as
+        # soon as both are in and never hold up the other sections
+        with st.spinner("🧠 MediMentor AI is analyzing your symptoms..."), ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                executor.submit(get_conditions, symptoms): "conditions",
+                executor.submit(get_health_tips, symptoms): "tips",
+            }
+            if pincode.strip():
+                futures[executor.submit(get_hospitals_near_pincode, pincode.strip())] = "hospitals"
+            results = {}
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures[future]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        results[name] = None
+                        if name == "hospitals":
+                            # Show error if hospital fetching fails
+                            sections["hospitals"].error(f"Error fetching hospitals: {e}")
+                        elif name == "history":
+                            st.warning(f"⚠️ Could not save this analysis to your history: {e}")
+                        else:
+                            sections[name].error(f"❌ Something went wrong: {e}")
+                        continue
+
+                    # Display each part as soon as it is ready
+                    if name == "conditions":
+                        show_section("conditions", "🔬 Most Probable Conditions", results[name], st.success)
+                    elif name == "tips":
+                        show_section("tips", "💡 Helpful Health Tips", results[name], st.info)
+                    elif name == "export":
+                        show_section("export", "📄 Export Report", results[name],
+                                     lambda link: st.markdown(link, unsafe_allow_html=True))
+                    elif name == "hospitals":
+                        with sections["hospitals"].container():
+                            if results[name]:
                                 # Display list of hospitals under a styled header
                                 st.markdown('<div class="section-header">🏥 Nearby Hospitals</div>', unsafe_allow_html=True)
-                                for h in hospitals:
+                                for h in results[name]:
                                     st.write(f"- {h}")
                             else:
                                 # Inform user if no hospitals found near the pincode
                                 st.info("No hospitals found near the entered pincode.")
-                        except Exception as e:
-                            # Show error if hospital fetching fails
-                            st.error(f"Error fetching hospitals: {e}")
 
-            except Exception as e:
-                # General error handler for the analysis process
-                st.error(f"❌ Something went wrong: {e}")
+                    # Once conditions and tips are in, save the history and build the PDF in the background
+                    if name in ("conditions", "tips") and results.get("conditions") and results.get("tips"):
+                        conditions, tips = results["conditions"], results["tips"]
+                        later = {
+                            executor.submit(save_symptom_history, symptoms, conditions, tips): "history",
+                            executor.submit(export_to_pdf, symptoms, conditions, specialist, risk_level, tips): "export",
+                        }
+                        futures.update(later)
+                        pending.update(later)
 
 # --- Footer with disclaimer and credits ---
 st.markdown("""
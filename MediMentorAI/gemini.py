@@ -1,32 +1,44 @@
 import os
 import google.generativeai as genai
 from dotenv import load_dotenv
+from response_cache import get_response, put_response, normalize_symptoms, normalize_text
 
 load_dotenv()
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 model = genai.GenerativeModel('gemini-2.0-flash')
 
+# Bump a version when its prompt changes, so responses cached for the old prompt are not reused
+PROMPT_VERSIONS = {"conditions": "1", "tips": "1", "medicine": "1"}
+
+def _generate(kind, key, prompt):
+    # Answer from the response cache when the same normalized input was asked recently
+    version = PROMPT_VERSIONS[kind]
+    cached = get_response(kind, key, version)
+    if cached is not None:
+        return cached
+    response = model.generate_content(prompt).text.strip()
+    put_response(kind, key, version, response)
+    return response
+
 def get_conditions(symptoms):
+    # The normalized symptoms are only the cache key; the prompt gets the user's own wording
     prompt = f"""You are a medical assistant. A user reports the following symptoms: {symptoms}.
     List the 5 most probable conditions that could be related, with a short explanation for each.
     Do not provide a diagnosis — only educational information. Also ask them to consult the doctor if they have any concerns.
 """
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return _generate("conditions", normalize_symptoms(symptoms), prompt)
 
 def get_health_tips(symptoms):
     prompt = f"""The user is experiencing: {symptoms}.
     Provide helpful and general health tips relevant to these symptoms, such as hydration, rest, nutrition, etc.
     Avoid giving any diagnostic or emergency advice. Also remind them to consult a healthcare professional if symptoms persist or worsen.
 """
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return _generate("tips", normalize_symptoms(symptoms), prompt)
 
 def get_medicine_info(medicine_name):
+    medicine_name = normalize_text(medicine_name)
     prompt = f"""You are a medical assistant. A user wants information about the medicine named "{medicine_name}".
     Provide a concise description about what it is used for, common dosage forms, typical side effects, and precautions.
     Do not provide any diagnosis or personalized advice. Encourage consulting a healthcare professional for more details.
 """
-    response = model.generate_content(prompt)
-    return response.text.strip()
-
+    return _generate("medicine", medicine_name, prompt)
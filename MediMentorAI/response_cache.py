@@ -0,0 +1,122 @@
+import re  # Whitespace normalization of cache keys
+import sqlite3  # SQLite database module for the on-disk cache
+import time  # Entry ages for expiry and recency for eviction
+
+DB_NAME = "medimentor_cache.db"  # SQLite database file name
+TTL_SECONDS = 7 * 24 * 3600  # Cached responses older than a week are fetched again
+MAX_ENTRIES = 5000  # Least recently used responses are evicted beyond this many
+MAX_SYMPTOM_WORDS = 3  # Longer comma-separated parts are free text, not symptom terms
+
+def _connect():
+    # A short-lived connection per call; WAL lets concurrent analyses read while one writes
+    conn = sqlite3.connect(DB_NAME, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def init_cache():
+    """
+    Create the responses table (one row per cached Gemini response) and the
+    stats table (hit and miss counters per kind of request) if they don't exist.
+    """
+    conn = _connect()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            kind TEXT,             -- conditions, tips or medicine
+            key TEXT,              -- Normalized user input
+            version TEXT,          -- Prompt version the response was generated with
+            response TEXT,         -- Gemini response text
+            created REAL,          -- Unix time the response was generated
+            last_used REAL,        -- Unix time of the last hit, for eviction
+            PRIMARY KEY (kind, key, version)
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS stats (kind TEXT PRIMARY KEY, hits INTEGER, misses INTEGER)")
+    conn.commit()
+    conn.close()
+
+def normalize_text(text):
+    # Lowercase, trim and collapse inner whitespace: "  Paracetamol " -> "paracetamol"
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def normalize_symptoms(symptoms):
+    # A list of short symptom terms is normalized, deduplicated and sorted:
+    # "Headache, fever,  headache" -> "fever, headache". Free text, where clause order
+    # carries meaning ("a headache since Monday, worse at night"), is only normalized.
+    parts = [normalize_text(part) for part in symptoms.split(",")]
+    parts = [part for part in parts if part]
+    if any(len(part.split()) > MAX_SYMPTOM_WORDS for part in parts):
+        return normalize_text(symptoms)
+    return ", ".join(sorted(set(parts)))
+
+def _count(conn, kind, hit):
+    conn.execute(
+        "INSERT INTO stats (kind, hits, misses) VALUES (?, ?, ?) "
+        "ON CONFLICT(kind) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+        (kind, int(hit), int(not hit))
+    )
+
+def get_response(kind, key, version):
+    """
+    Return the cached response for a normalized input, or None if it is
+    missing or older than TTL_SECONDS. Every lookup counts as a hit or a miss.
+
+    Parameters:
+    - kind: which request the response answers (conditions, tips or medicine)
+    - key: normalized user input
+    - version: prompt version the response must have been generated with
+    """
+    now = time.time()
+    conn = _connect()
+    row = conn.execute(
+        "SELECT response FROM responses WHERE kind = ? AND key = ? AND version = ? AND created >= ?",
+        (kind, key, version, now - TTL_SECONDS)
+    ).fetchone()
+    if row:
+        conn.execute(
+            "UPDATE responses SET last_used = ? WHERE kind = ? AND key = ? AND version = ?",
+            (now, kind, key, version)
+        )
+    _count(conn, kind, row is not None)
+    conn.commit()
+    conn.close()
+    return row[0] if row else None
+
+def put_response(kind, key, version, response):
+    """
+    Store a response, drop expired ones and evict the least recently used
+    beyond MAX_ENTRIES.
+    """
+    now = time.time()
+    conn = _connect()
+    conn.execute(
+        "INSERT OR REPLACE INTO responses (kind, key, version, response, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+        (kind, key, version, response, now, now)
+    )
+    conn.execute("DELETE FROM responses WHERE created < ?", (now - TTL_SECONDS,))
+    conn.execute(
+        "DELETE FROM responses WHERE rowid IN "
+        "(SELECT rowid FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+        (MAX_ENTRIES,)
+    )
+    conn.commit()
+    conn.close()
+
+def get_stats():
+    """
+    Return hits, misses and hit rate per kind of request, plus "all".
+
+    Returns:
+    - Dict of kind -> {"hits": int, "misses": int, "hit_rate": float or None}
+    """
+    conn = _connect()
+    rows = conn.execute("SELECT kind, hits, misses FROM stats").fetchall()
+    conn.close()
+    totals = {"all": [0, 0]}
+    for kind, hits, misses in rows:
+        totals[kind] = [hits, misses]
+        totals["all"][0] += hits
+        totals["all"][1] += misses
+    return {
+        kind: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else None}
+        for kind, (hits, misses) in totals.items()
+    }
@@ -135,3 +135,8 @@ def get_hospitals_nearby_overpass(lat, lon, radius=5000):
         if len(hospitals) >= 5:
             break
     return hospitals
+
+def get_hospitals_near_pincode(pincode, country='India'):
+    # Geocode the pincode, then search around it; the two requests depend on each other and run in sequence
+    lat, lon = get_lat_lng_from_pincode_nominatim(pincode, country)
+    return get_hospitals_nearby_overpass(lat, lon)